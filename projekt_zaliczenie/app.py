@@ -1,19 +1,66 @@
 import time
+import argparse
 import threading
+from typing import TYPE_CHECKING
 import numpy as np
-import whisper
 import sounddevice as sd
 from queue import Queue
 from rich.console import Console
-from langchain.memory import ConversationBufferMemory
 from langchain.chains import ConversationChain
 from langchain.prompts import PromptTemplate
 from langchain_community.llms import Ollama
-from tts import TextToSpeechService
+from audio_cache import AudioCache
+from audio_buffer import AudioRingBuffer
+from lazy_model import LazyModel
+from conversation_memory import TokenBudgetMemory
+from vad import VoiceActivityDetector, trim_silence
+from transcript_cache import TranscriptCache
+from streaming_stt import StreamingTranscriber
+from ollama_chat import OllamaConversation
+
+if TYPE_CHECKING:
+    from tts import TextToSpeechService
+    from tts_pool import SynthesisPool
+
+
+def load_stt(precision: str | None = None, audio_context: str = "full"):
+    from stt import SpeechToTextService
+
+    return SpeechToTextService(
+        "base.en", precision=precision, audio_context=audio_context
+    )
+
+
+def load_tts(workers: int = 0, precision: str = "fp32", compile: bool = False):
+    # The pool offers the same methods as the service, so either is used as `tts`
+    service: "TextToSpeechService | SynthesisPool"
+    if workers:
+        from tts_pool import SynthesisPool
+
+        service = SynthesisPool(
+            workers=workers if workers > 0 else None,
+            precision=precision,
+            compile=compile,
+            audio_cache=AudioCache(),
+        )
+    else:
+        from tts import TextToSpeechService
+
+        service = TextToSpeechService(
+            audio_cache=AudioCache(), precision=precision, compile=compile
+        )
+    # Pay the cold-start cost while loading instead of on the first reply
+    service.warmup()
+    return service
+
 
 console = Console()
-stt = whisper.load_model("base.en")
-tts = TextToSpeechService()
+# Both models are loaded on first use, or in the background by warm_up() at launch
+stt = LazyModel(load_stt)
+tts = LazyModel(load_tts)
+transcript_cache = None
+# Set by --ollama-context, replaces the chain with a conversation that reuses Ollama's context
+conversation = None
 
 
 template = """
@@ -28,29 +75,32 @@ And here is the user's follow-up: {input}
 Your response:
 """
 PROMPT = PromptTemplate(input_variables=["history", "input"], template=template)
+llm = Ollama(model="tinydolphin")
 chain = ConversationChain(
     prompt=PROMPT,
     verbose=False,
-    memory=ConversationBufferMemory(ai_prefix="Assistant:"),
-    llm=Ollama(model="tinydolphin"),
+    # Recent turns verbatim plus a summary of older ones, so the prompt stops growing with the session
+    memory=TokenBudgetMemory(llm=llm),
+    llm=llm,
 )
 
 
-def record_audio(stop_event, data_queue):
+def record_audio(stop_event, capture_buffer):
     """
-    Captures audio data from the user's microphone and adds it to a queue for further processing.
+    Captures audio data from the user's microphone and writes it into a ring buffer for further processing.
 
     Args:
         stop_event (threading.Event): An event that, when set, signals the function to stop recording.
-        data_queue (queue.Queue): A queue to which the recorded audio data will be added.
+        capture_buffer (AudioRingBuffer): The buffer the recorded audio is written into.
 
     Returns:
         None
     """
+
     def callback(indata, frames, time, status):
         if status:
             console.print(status)
-        data_queue.put(bytes(indata))
+        capture_buffer.write(np.frombuffer(indata, dtype=np.int16))
 
     with sd.RawInputStream(
         samplerate=16000, dtype="int16", channels=1, callback=callback, device=11
@@ -59,6 +109,51 @@ def record_audio(stop_event, data_queue):
             time.sleep(0.1)
 
 
+def record_utterance(
+    vad, capture_buffer, no_speech_timeout: float = 10.0
+) -> np.ndarray:
+    """
+    Captures audio from the user's microphone until the voice activity detector reports the end of an utterance.
+
+    Args:
+        vad (VoiceActivityDetector): The detector the audio is fed into.
+        capture_buffer (AudioRingBuffer): The buffer the recorded audio is written into. It is reset first.
+        no_speech_timeout (float, optional): Seconds to wait for speech to start before giving up. Defaults to 10.
+
+    Returns:
+        numpy.ndarray: The float32 speech samples without leading and trailing silence, empty if nobody spoke.
+        The array is a view into `capture_buffer` and is overwritten by the next recording.
+    """
+    done = threading.Event()
+    capture_buffer.reset()
+
+    def callback(indata, frames, time, status):
+        if status:
+            console.print(status)
+        samples = np.frombuffer(indata, dtype=np.int16)
+        capture_buffer.write(samples)
+        if vad.accept(samples):
+            done.set()
+
+    started = time.monotonic()
+    with sd.RawInputStream(
+        samplerate=vad.sample_rate,
+        blocksize=vad.frame_samples,
+        dtype="int16",
+        channels=1,
+        callback=callback,
+        device=11,
+    ):
+        while not done.wait(0.1):
+            if not vad.triggered and time.monotonic() - started > no_speech_timeout:
+                break
+
+    speech_range = vad.speech_range()
+    if speech_range is None:
+        return capture_buffer.to_float32(0, 0)
+    return capture_buffer.to_float32(*speech_range)
+
+
 def transcribe(audio_np: np.ndarray) -> str:
     """
     Transcribes the given audio data using the Whisper speech recognition model.
@@ -69,11 +164,43 @@ def transcribe(audio_np: np.ndarray) -> str:
     Returns:
         str: The transcribed text.
     """
-    result = stt.transcribe(audio_np, fp16=True)  # Set fp16=True if using a GPU
+    # Silence only costs encoder time, and with a dynamic audio context a shorter input is cheaper
+    audio_np = trim_silence(audio_np)
+    if audio_np.size == 0:
+        return ""
+    if transcript_cache is not None:
+        # Repeated short commands are answered from the cache without running the model
+        text = transcript_cache.get(audio_np)
+        if text is not None:
+            return text
+    result = stt.transcribe(audio_np)
     text = result["text"].strip()
+    if transcript_cache is not None:
+        transcript_cache.put(audio_np, text)
     return text
 
 
+def record_and_transcribe(vad, capture_buffer, on_partial=None):
+    """
+    Records an utterance like record_utterance while transcribing it incrementally, so the transcript is
+    ready shortly after the user stops speaking.
+
+    Args:
+        vad (VoiceActivityDetector): The detector the audio is fed into.
+        capture_buffer (AudioRingBuffer): The buffer the recorded audio is written into.
+        on_partial (callable, optional): Called with the committed text and the current partial hypothesis.
+
+    Returns:
+        tuple: The float32 speech samples and the transcribed text.
+    """
+    transcriber = StreamingTranscriber(
+        stt, capture_buffer, vad=vad, on_partial=on_partial
+    )
+    transcriber.start()
+    audio_np = record_utterance(vad, capture_buffer)
+    return audio_np, transcriber.finish()
+
+
 def get_llm_response(text: str) -> str:
     """
     Generates a response to the given text using the Llama-2 language model.
@@ -84,6 +211,13 @@ def get_llm_response(text: str) -> str:
     Returns:
         str: The generated response.
     """
+    if conversation is not None:
+        response = conversation.send(text)
+        stats = conversation.stats[-1]
+        console.print(
+            f"[dim]Prompt eval: {stats['prompt_eval_count']} tokens in {stats['prompt_eval_seconds']:.2f} s"
+        )
+        return response
     response = chain.predict(input=text)
     if response.startswith("Assistant:"):
         response = response[len("Assistant:") :].strip()
@@ -105,43 +239,161 @@ def play_audio(sample_rate, audio_array):
     sd.wait()
 
 
+def play_audio_stream(chunks):
+    """
+    Plays audio chunks while they are still being produced, so playback of the first sentence
+    overlaps with the synthesis of the following ones.
+
+    Args:
+        chunks (iterable): An iterable of (sample_rate, audio_array) tuples, e.g. from tts.stream_synthesize.
+
+    Returns:
+        None
+    """
+    audio_queue = Queue()  # type: ignore[var-annotated]
+
+    def player():
+        while True:
+            chunk = audio_queue.get()
+            if chunk is None:
+                break
+            play_audio(*chunk)
+
+    playback_thread = threading.Thread(target=player, daemon=True)
+    playback_thread.start()
+    try:
+        for chunk in chunks:
+            audio_queue.put(chunk)
+    finally:
+        audio_queue.put(None)
+        playback_thread.join()
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local talking LLM")
+    parser.add_argument(
+        "--tts-workers",
+        type=int,
+        default=0,
+        help="Number of Bark worker processes; 0 runs Bark in-process, -1 sizes the pool from available RAM",
+    )
+    parser.add_argument(
+        "--tts-precision",
+        default="fp32",
+        choices=["fp32", "bf16", "int8"],
+        help="Numeric precision of the Bark model",
+    )
+    parser.add_argument(
+        "--stt-precision",
+        choices=["fp32", "fp16", "int8"],
+        help="Numeric precision of the Whisper model; defaults to fp16 on a GPU and fp32 on the CPU",
+    )
+    parser.add_argument(
+        "--stt-audio-context",
+        default="full",
+        choices=["full", "dynamic"],
+        help="Encode short utterances over their own length instead of Whisper's 30 s window",
+    )
+    parser.add_argument(
+        "--stt-cache",
+        action="store_true",
+        help="Reuse transcripts of near-identical short utterances, matched by an audio fingerprint",
+    )
+    parser.add_argument(
+        "--push-to-talk",
+        action="store_true",
+        help="Stop recording on a second Enter instead of detecting the end of speech",
+    )
+    parser.add_argument(
+        "--stream-transcription",
+        action="store_true",
+        help="Transcribe while the user is speaking instead of after the recording",
+    )
+    parser.add_argument(
+        "--tts-compile",
+        action="store_true",
+        help="Compile the Bark sub-models with torch.compile",
+    )
+    parser.add_argument(
+        "--history-tokens",
+        type=int,
+        default=512,
+        help="Token budget of the conversation history in the prompt",
+    )
+    parser.add_argument(
+        "--ollama-context",
+        action="store_true",
+        help="Carry Ollama's context between turns so only the new message is evaluated",
+    )
+    args = parser.parse_args()
+    chain.memory.max_tokens = args.history_tokens
+    if args.ollama_context:
+        conversation = OllamaConversation()
+    stt = LazyModel(lambda: load_stt(args.stt_precision, args.stt_audio_context))
+    if args.stt_cache:
+        transcript_cache = TranscriptCache()
+    tts = LazyModel(
+        lambda: load_tts(args.tts_workers, args.tts_precision, args.tts_compile)
+    )
+
+    # Preallocated once, holds up to 2 minutes of 16 kHz audio per recording
+    capture_buffer = AudioRingBuffer(120 * 16000)
+
     console.print("[cyan]Assistant started! Press Ctrl+C to exit.")
+    stt.warm_up()
+    tts.warm_up()
 
     try:
         while True:
-            console.input(
-                "Press Enter to start recording, then press Enter again to stop."
-            )
-
-            data_queue = Queue()  # type: ignore[var-annotated]
-            stop_event = threading.Event()
-            recording_thread = threading.Thread(
-                target=record_audio,
-                args=(stop_event, data_queue),
-            )
-            recording_thread.start()
-
-            input()
-            stop_event.set()
-            recording_thread.join()
-
-            audio_data = b"".join(list(data_queue.queue))
-            audio_np = (
-                np.frombuffer(audio_data, dtype=np.int16).astype(np.float32) / 32768.0
-            )
+            text = None
+            if args.push_to_talk:
+                console.input(
+                    "Press Enter to start recording, then press Enter again to stop."
+                )
+
+                capture_buffer.reset()
+                stop_event = threading.Event()
+                recording_thread = threading.Thread(
+                    target=record_audio,
+                    args=(stop_event, capture_buffer),
+                )
+                recording_thread.start()
+
+                input()
+                stop_event.set()
+                recording_thread.join()
+
+                audio_np = capture_buffer.to_float32()
+            elif args.stream_transcription:
+                console.input(
+                    "Press Enter and speak, recording stops when you stop talking."
+                )
+                with console.status("Listening...", spinner="earth") as status:
+                    audio_np, text = record_and_transcribe(
+                        VoiceActivityDetector(),
+                        capture_buffer,
+                        on_partial=lambda committed, partial: status.update(
+                            f"Listening... [yellow]{committed} [dim]{partial}"
+                        ),
+                    )
+            else:
+                console.input(
+                    "Press Enter and speak, recording stops when you stop talking."
+                )
+                with console.status("Listening...", spinner="earth"):
+                    audio_np = record_utterance(VoiceActivityDetector(), capture_buffer)
 
             if audio_np.size > 0:
-                with console.status("Transcribing...", spinner="earth"):
-                    text = transcribe(audio_np)
+                if text is None:
+                    with console.status("Transcribing...", spinner="earth"):
+                        text = transcribe(audio_np)
                 console.print(f"[yellow]You: {text}")
 
                 with console.status("Generating response...", spinner="earth"):
                     response = get_llm_response(text)
-                    sample_rate, audio_array = tts.long_form_synthesize(response)
 
                 console.print(f"[cyan]Assistant: {response}")
-                play_audio(sample_rate, audio_array)
+                play_audio_stream(tts.stream_synthesize(response))
             else:
                 console.print(
                     "[red]No audio recorded. Please ensure your microphone is working."
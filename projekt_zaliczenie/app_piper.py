@@ -1,18 +1,34 @@
+import os
+import json
 import time
+import wave
+import argparse
 import threading
+import nltk
 import numpy as np
-import whisper
 import sounddevice as sd
 import subprocess
 from queue import Queue
 from rich.console import Console
-from langchain.memory import ConversationBufferMemory
 from langchain.chains import ConversationChain
 from langchain.prompts import PromptTemplate
 from langchain_community.llms import Ollama
+from audio_cache import AudioCache
+from audio_buffer import AudioRingBuffer
+from lazy_model import LazyModel
+from conversation_memory import TokenBudgetMemory
+from vad import VoiceActivityDetector, trim_silence
+from ollama_chat import OllamaConversation
+
+def load_stt(precision=None, audio_context="full"):
+    from stt import SpeechToTextService
+    return SpeechToTextService("base.en", precision=precision, audio_context=audio_context)
 
 console = Console()
-stt = whisper.load_model("base.en")
+stt = LazyModel(load_stt)  # Loaded on first use, or in the background by warm_up() at launch
+PIPER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "piper")  # The piper binary and its voices
+audio_cache = AudioCache()
+conversation = None  # Set by --ollama-context
 
 template = """
 You are a helpful and friendly AI assistant. You are polite, respectful, and aim to provide concise responses of less 
@@ -26,69 +42,168 @@ And here is the user's follow-up: {input}
 Your response:
 """
 PROMPT = PromptTemplate(input_variables=["history", "input"], template=template)
+llm = Ollama(model="tinydolphin")
 chain = ConversationChain(
     prompt=PROMPT,
     verbose=False,
-    memory=ConversationBufferMemory(ai_prefix="Assistant:"),
-    llm=Ollama(model="tinydolphin"),
+    memory=TokenBudgetMemory(llm=llm),  # Bounded history: recent turns plus a summary of older ones
+    llm=llm,
 )
 
-def record_audio(stop_event, data_queue):
+def record_utterance(vad, capture_buffer, no_speech_timeout=10.0):
+    done = threading.Event()
+    capture_buffer.reset()
+
     def callback(indata, frames, time, status):
         if status:
             console.print(status)
-        data_queue.put(bytes(indata))
+        samples = np.frombuffer(indata, dtype=np.int16)
+        capture_buffer.write(samples)
+        if vad.accept(samples):
+            done.set()
 
+    started = time.monotonic()
     with sd.RawInputStream(
-        samplerate=16000, dtype="int16", channels=1, callback=callback, device=11
+        samplerate=vad.sample_rate, blocksize=vad.frame_samples, dtype="int16", channels=1, callback=callback, device=11
     ):
-        while not stop_event.is_set():
-            time.sleep(0.1)
+        while not done.wait(0.1):
+            if not vad.triggered and time.monotonic() - started > no_speech_timeout:
+                break
+
+    speech_range = vad.speech_range()
+    if speech_range is None:
+        return capture_buffer.to_float32(0, 0)
+    return capture_buffer.to_float32(*speech_range)
 
 def transcribe(audio_np: np.ndarray) -> str:
-    result = stt.transcribe(audio_np, fp16=False)
+    audio_np = trim_silence(audio_np)
+    if audio_np.size == 0:
+        return ""
+    result = stt.transcribe(audio_np)
     text = result["text"].strip()
     return text
 
 def get_llm_response(text: str) -> str:
+    if conversation is not None:
+        response = conversation.send(text)
+        console.print(f"[dim]Prompt eval: {conversation.stats[-1]['prompt_eval_count']} tokens")
+        return response
     response = chain.predict(input=text)
     if response.startswith("Assistant:"):
         response = response[len("Assistant:") :].strip()
     return response
 
-def start_piper(model_path):
-    log_file = open('piper_logs.txt', 'a')  # Append to the log file
-    piper_command = ['./piper/piper', '--model', model_path, '--output-raw']
-    piper_process = subprocess.Popen(piper_command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=log_file, bufsize=0)
-    threading.Thread(target=play_audio, args=(piper_process.stdout,), daemon=True).start()
-    return piper_process
+def load_piper_config(model_path):
+    """Reads the sample rate and inference settings of a voice from its .onnx.json in the piper directory; raises if it is missing."""
+    with open(os.path.join(PIPER_DIR, model_path + '.json')) as config_file:
+        config = json.load(config_file)
+    return config["audio"]["sample_rate"], config.get("inference", {})
 
-def play_audio(pipe):
-    aplay_command = ['aplay', '-r', '22050', '-f', 'S16_LE', '-t', 'raw', '-B', '2048']
-    aplay_process = subprocess.Popen(aplay_command, stdin=pipe, stderr=subprocess.PIPE)
-
-    for line in aplay_process.stderr:
+def start_piper(model_path, output_dir):
+    log_file = open('piper_logs.txt', 'a')  # Append to the log file
+    # Every input line is rendered to its own WAV file in output_dir, whose path piper prints on stdout
+    piper_command = [os.path.join(PIPER_DIR, 'piper'), '--model', os.path.join(PIPER_DIR, model_path), '--output_dir', output_dir]
+    return subprocess.Popen(piper_command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=log_file, bufsize=0)
+
+def start_aplay(sample_rate):
+    aplay_command = ['aplay', '-r', str(sample_rate), '-f', 'S16_LE', '-t', 'raw', '-B', '2048']
+    aplay_process = subprocess.Popen(aplay_command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+    threading.Thread(target=report_aplay_errors, args=(aplay_process.stderr,), daemon=True).start()
+    return aplay_process
+
+def report_aplay_errors(pipe):
+    for line in pipe:
         console.print(f"aplay Error: {line.decode().strip()}", style="red")
 
+def render_sentence(sentence, piper_process):
+    piper_process.stdin.write((sentence + '\n').encode('utf-8'))
+    piper_process.stdin.flush()
+    wav_path = piper_process.stdout.readline().decode('utf-8').strip()
+    if not wav_path:
+        raise EOFError("piper closed its output instead of rendering the sentence")
+    with wave.open(wav_path, 'rb') as wav_file:
+        pcm = np.frombuffer(wav_file.readframes(wav_file.getnframes()), dtype=np.int16)
+    os.remove(wav_path)
+    return pcm
+
+def restart(process, start, *args):
+    process.kill()
+    process.wait()
+    return start(*args)
+
+def render_with_restart(sentence, piper_process, model_path, output_dir):
+    """Renders a sentence, restarting piper and trying once more if it fails. Returns the audio or None, and the piper process."""
+    for _ in range(2):
+        try:
+            return render_sentence(sentence, piper_process), piper_process
+        except (EOFError, OSError, wave.Error) as e:
+            console.print(f"piper Error: {e}, restarting piper", style="red")
+            piper_process = restart(piper_process, start_piper, model_path, output_dir)
+    console.print(f"Skipped a sentence piper could not render: {sentence}", style="red")
+    return None, piper_process
+
+def speak(speech_queue, model_path, output_dir):
+    """
+    Plays queued responses sentence by sentence, reusing cached audio instead of invoking piper where possible.
+
+    The thread owns the piper and aplay processes: either one is restarted when it dies, so a crash is reported
+    on the console instead of silently ending playback for the rest of the session.
+    """
+    sample_rate, inference_params = load_piper_config(model_path)
+    piper_process = start_piper(model_path, output_dir)
+    aplay_process = start_aplay(sample_rate)
+    try:
+        while True:
+            response = speech_queue.get()
+            if response is None:
+                break
+            for sentence in nltk.sent_tokenize(response):
+                key = audio_cache.key(sentence, voice=model_path, sample_rate=sample_rate, params=inference_params, dtype=np.int16)
+                pcm = audio_cache.get(key, dtype=np.int16)
+                if pcm is None:
+                    pcm, piper_process = render_with_restart(sentence, piper_process, model_path, output_dir)
+                    if pcm is None:
+                        continue
+                    audio_cache.put(key, pcm, dtype=np.int16)
+                try:
+                    aplay_process.stdin.write(pcm.data)
+                    aplay_process.stdin.flush()
+                except OSError as e:  # E.g. BrokenPipeError when aplay exited
+                    console.print(f"aplay Error: {e}, restarting aplay", style="red")
+                    aplay_process = restart(aplay_process, start_aplay, sample_rate)
+    finally:
+        piper_process.terminate()
+        aplay_process.terminate()
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local talking LLM with Piper")
+    parser.add_argument("--stt-precision", choices=["fp32", "fp16", "int8"], help="Numeric precision of the Whisper model; defaults to fp16 on a GPU and fp32 on the CPU")
+    parser.add_argument("--stt-audio-context", default="full", choices=["full", "dynamic"], help="Encode short utterances over their own length instead of Whisper's 30 s window")
+    parser.add_argument("--history-tokens", type=int, default=512, help="Token budget of the conversation history in the prompt")
+    parser.add_argument("--ollama-context", action="store_true", help="Carry Ollama's context between turns so only the new message is evaluated")
+    args = parser.parse_args()
+    chain.memory.max_tokens = args.history_tokens
+    if args.ollama_context:
+        conversation = OllamaConversation()
+    stt = LazyModel(lambda: load_stt(args.stt_precision, args.stt_audio_context))
+
     console.print("[cyan]Assistant started! Press Ctrl+C to exit.")
-    piper_process = start_piper("en_GB-cori-medium.onnx")
+    stt.warm_up()
+    model_path = "en_GB-cori-medium.onnx"
+    sample_rate, _ = load_piper_config(model_path)  # Fails early if the voice is missing
+    piper_output_dir = os.path.join(audio_cache.cache_dir, "piper")
+    os.makedirs(piper_output_dir, exist_ok=True)
+    speech_queue: Queue[str | None] = Queue()
+    capture_buffer = AudioRingBuffer(120 * 16000)  # Preallocated once, reused for every recording
+    speech_thread = threading.Thread(target=speak, args=(speech_queue, model_path, piper_output_dir), daemon=True)
+    speech_thread.start()
 
     try:
         while True:
-            console.input("Press Enter to start recording, then press Enter again to stop.")
-
-            data_queue = Queue()
-            stop_event = threading.Event()
-            recording_thread = threading.Thread(target=record_audio, args=(stop_event, data_queue))
-            recording_thread.start()
-
-            input()
-            stop_event.set()
-            recording_thread.join()
+            console.input("Press Enter and speak, recording stops when you stop talking.")
 
-            audio_data = b"".join(list(data_queue.queue))
-            audio_np = np.frombuffer(audio_data, dtype=np.int16).astype(np.float32) / 32768.0
+            with console.status("Listening...", spinner="earth"):
+                audio_np = record_utterance(VoiceActivityDetector(), capture_buffer)
 
             if audio_np.size > 0:
                 with console.status("Transcribing...", spinner="earth"):
@@ -97,8 +212,7 @@ if __name__ == "__main__":
 
                 with console.status("Generating response...", spinner="earth"):
                     response = get_llm_response(text)
-                    piper_process.stdin.write((response + '\n').encode('utf-8'))
-                    piper_process.stdin.flush()
+                    speech_queue.put(response)
 
                 console.print(f"[cyan]Assistant: {response}")
             else:
@@ -108,7 +222,7 @@ if __name__ == "__main__":
         console.print("\n[red]Exiting...")
 
     finally:
-        if piper_process:
-            piper_process.terminate()
+        speech_queue.put(None)
+        speech_thread.join(timeout=5)  # Lets the speech thread stop piper and aplay
 
     console.print("[blue]Session ended.")
@@ -0,0 +1,177 @@
+import numpy as np
+
+# Rough speaking rate used to size output buffers up front
+SECONDS_PER_CHARACTER = 0.08
+# Silence inserted between the sentences of a reply
+SENTENCE_PAUSE_SECONDS = 0.25
+
+
+def with_pauses(chunks):
+    """
+    Yields (sample_rate, audio_array) chunks with a chunk of SENTENCE_PAUSE_SECONDS of silence between them.
+
+    Args:
+        chunks (iterable): The audio of consecutive sentences, e.g. from stream_synthesize.
+
+    Yields:
+        tuple: A tuple containing the sample rate and an audio array, of a sentence or of a pause.
+    """
+    first = True
+    for sample_rate, audio_array in chunks:
+        if not first:
+            yield sample_rate, np.zeros(
+                int(SENTENCE_PAUSE_SECONDS * sample_rate), dtype=audio_array.dtype
+            )
+        first = False
+        yield sample_rate, audio_array
+
+
+class AudioBuffer:
+    def __init__(self, capacity: int, dtype=np.float32):
+        """
+        Initializes the AudioBuffer class, a growable preallocated buffer that audio is written into in place.
+
+        Args:
+            capacity (int): The initial number of samples to allocate.
+            dtype (numpy.dtype, optional): The sample type of the buffer. Defaults to numpy.float32.
+        """
+        self._buffer = np.empty(max(capacity, 1), dtype=dtype)
+        self._size = 0
+
+    def _reserve(self, samples: int):
+        required = self._size + samples
+        if required > len(self._buffer):
+            # Resizing in place lets realloc extend the allocation instead of copying it
+            self._buffer.resize(
+                max(required, int(len(self._buffer) * 1.5)), refcheck=False
+            )
+
+    def append(self, audio_array: np.ndarray):
+        """
+        Copies the given audio to the end of the buffer.
+
+        Args:
+            audio_array (numpy.ndarray): The audio to be appended.
+
+        Returns:
+            None
+        """
+        audio_array = np.ravel(audio_array)
+        self._reserve(len(audio_array))
+        self._buffer[self._size : self._size + len(audio_array)] = audio_array
+        self._size += len(audio_array)
+
+    def append_silence(self, samples: int):
+        """
+        Appends the given number of silent samples by zero-filling the buffer.
+
+        Args:
+            samples (int): The number of samples of silence.
+
+        Returns:
+            None
+        """
+        self._reserve(samples)
+        self._buffer[self._size : self._size + samples] = 0
+        self._size += samples
+
+    def finalize(self) -> np.ndarray:
+        """
+        Trims the buffer to the written samples and returns it. The buffer must not be appended to afterwards.
+
+        Returns:
+            numpy.ndarray: The audio written so far.
+        """
+        self._buffer.resize(self._size, refcheck=False)
+        return self._buffer
+
+
+class AudioRingBuffer:
+    def __init__(self, capacity: int):
+        """
+        Initializes the AudioRingBuffer class, a preallocated int16 ring buffer that audio callbacks write into.
+
+        Positions are counted in samples since the last `reset`. Once more than `capacity` samples have been
+        written, the oldest ones are overwritten.
+
+        Args:
+            capacity (int): The number of samples the buffer holds.
+        """
+        self.capacity = capacity
+        self._samples = np.zeros(capacity, dtype=np.int16)
+        self._float = np.empty(capacity, dtype=np.float32)
+        self.written = 0
+
+    def reset(self):
+        """
+        Discards the recorded audio without releasing the memory.
+
+        Returns:
+            None
+        """
+        self.written = 0
+
+    def write(self, samples: np.ndarray):
+        """
+        Copies audio into the buffer, e.g. from a sounddevice callback.
+
+        Args:
+            samples (numpy.ndarray): Mono int16 audio.
+
+        Returns:
+            None
+        """
+        samples = np.ravel(samples)
+        if len(samples) > self.capacity:
+            # Only the newest samples fit, skip the ones that would be overwritten anyway
+            self.written += len(samples) - self.capacity
+            samples = samples[-self.capacity :]
+        offset = self.written % self.capacity
+        head = min(len(samples), self.capacity - offset)
+        self._samples[offset : offset + head] = samples[:head]
+        self._samples[: len(samples) - head] = samples[head:]
+        self.written += len(samples)
+
+    def view(self, start: int = 0, end: int | None = None) -> np.ndarray:
+        """
+        Returns the int16 audio between two positions.
+
+        The result is a zero-copy view unless the range wraps around the end of the buffer.
+
+        Args:
+            start (int, optional): The first position. Defaults to 0, clamped to the oldest available sample.
+            end (int, optional): The position after the last sample. Defaults to everything written so far.
+
+        Returns:
+            numpy.ndarray: The audio samples.
+        """
+        end = self.written if end is None else min(end, self.written)
+        start = max(start, end - self.capacity, self.written - self.capacity, 0)
+        if start >= end:
+            return self._samples[:0]
+
+        first = start % self.capacity
+        last = first + (end - start)
+        if last <= self.capacity:
+            return self._samples[first:last]
+        return np.concatenate(
+            (self._samples[first:], self._samples[: last - self.capacity])
+        )
+
+    def to_float32(self, start: int = 0, end: int | None = None) -> np.ndarray:
+        """
+        Converts the audio between two positions to float32 in [-1, 1) in a single pass, into a reusable buffer.
+
+        The returned array is overwritten by the next call.
+
+        Args:
+            start (int, optional): The first position. Defaults to 0.
+            end (int, optional): The position after the last sample. Defaults to everything written so far.
+
+        Returns:
+            numpy.ndarray: The float32 audio samples.
+        """
+        samples = self.view(start, end)
+        out = self._float[: len(samples)]
+        np.multiply(samples, 1 / 32768.0, out=out, casting="unsafe")
+        return out
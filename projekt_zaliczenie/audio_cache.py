@@ -0,0 +1,148 @@
+import os
+import json
+import hashlib
+import tempfile
+import unicodedata
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.expanduser("~"), ".cache", "local-talking-llm", "audio"
+)
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalizes text before it is used as part of a cache key, so that whitespace differences do not cause misses.
+
+    Args:
+        text (str): The text to be normalized.
+
+    Returns:
+        str: The normalized text.
+    """
+    return unicodedata.normalize("NFC", " ".join(text.split()))
+
+
+class AudioCache:
+    def __init__(
+        self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = 256 * 1024**2
+    ):
+        """
+        Initializes the AudioCache class, a content-addressed store of synthesized audio on disk.
+
+        Every entry is a raw PCM file that is memory-mapped on a hit. The least recently used entries
+        are evicted once the total size of the cache exceeds `max_bytes`.
+
+        Args:
+            cache_dir (str, optional): The directory in which the audio files are stored.
+            Defaults to ~/.cache/local-talking-llm/audio.
+            max_bytes (int, optional): The maximum total size of the cache in bytes. Defaults to 256 MiB.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key(
+        self,
+        text: str,
+        voice: str,
+        sample_rate: int,
+        params: dict | None = None,
+        dtype=np.float32,
+    ) -> str:
+        """
+        Builds the cache key for a piece of synthesized audio.
+
+        Args:
+            text (str): The synthesized text.
+            voice (str): The voice used for the synthesis, e.g. a Bark voice preset or a Piper onnx model.
+            sample_rate (int): The sample rate of the audio.
+            params (dict, optional): Any inference parameters that influence the output. Defaults to None.
+            dtype (numpy.dtype, optional): The sample type of the stored audio. Defaults to numpy.float32.
+
+        Returns:
+            str: The hex digest identifying the audio.
+        """
+        payload = json.dumps(
+            {
+                "text": normalize_text(text),
+                "voice": voice,
+                "sample_rate": sample_rate,
+                "params": params or {},
+                "dtype": np.dtype(dtype).str,
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ".pcm")
+
+    def get(self, key: str, dtype=np.float32):
+        """
+        Looks up cached audio.
+
+        Args:
+            key (str): The cache key returned by `key`.
+            dtype (numpy.dtype, optional): The sample type the audio was stored with. Defaults to numpy.float32.
+
+        Returns:
+            numpy.ndarray: A read-only memory-mapped view of the audio, or None on a cache miss.
+        """
+        path = self._path(key)
+        try:
+            os.utime(path)
+            if os.path.getsize(path) == 0:
+                return np.zeros(0, dtype=dtype)
+            return np.memmap(path, dtype=dtype, mode="r")
+        except OSError:
+            return None
+
+    def put(self, key: str, audio_array: np.ndarray, dtype=np.float32):
+        """
+        Stores audio in the cache and evicts the least recently used entries if the cache grew too large.
+
+        Args:
+            key (str): The cache key returned by `key`.
+            audio_array (numpy.ndarray): The audio to be stored.
+            dtype (numpy.dtype, optional): The sample type the audio is stored with. Defaults to numpy.float32.
+
+        Returns:
+            None
+        """
+        audio_array = np.ascontiguousarray(audio_array, dtype=dtype)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(audio_array.data)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the cache fits into `max_bytes`.
+
+        Returns:
+            None
+        """
+        entries = []
+        total = 0
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith(".pcm"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
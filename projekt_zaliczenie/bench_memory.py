@@ -0,0 +1,87 @@
+import argparse
+import tracemalloc
+import numpy as np
+from audio_buffer import AudioBuffer
+
+SAMPLE_RATE = 24000  # Bark's output sample rate
+
+
+def fake_sentences(reply_seconds: float, sentence_seconds: float, sample_rate: int):
+    """
+    Yields random float32 arrays that stand in for synthesized sentences, one at a time like the model would.
+
+    Args:
+        reply_seconds (float): The total length of the reply.
+        sentence_seconds (float): The length of a single sentence.
+        sample_rate (int): The sample rate of the audio.
+
+    Yields:
+        numpy.ndarray: The audio of a single sentence.
+    """
+    rng = np.random.default_rng(0)
+    for _ in range(int(reply_seconds / sentence_seconds)):
+        yield rng.standard_normal(int(sentence_seconds * sample_rate), dtype=np.float32)
+
+
+def concatenate_pieces(sentences, silence_samples: int) -> np.ndarray:
+    """The original long_form_synthesize strategy: collect pieces, then concatenate them."""
+    pieces = []
+    silence = np.zeros(silence_samples)
+    for audio_array in sentences:
+        pieces += [audio_array, silence.copy()]
+    return np.concatenate(pieces)
+
+
+def preallocated_buffer(sentences, silence_samples: int, capacity: int) -> np.ndarray:
+    """The AudioBuffer strategy: write every sentence into a preallocated buffer in place."""
+    buffer = AudioBuffer(capacity)
+    for audio_array in sentences:
+        buffer.append(audio_array)
+        buffer.append_silence(silence_samples)
+    return buffer.finalize()
+
+
+def measure(func, *args) -> int:
+    """
+    Runs the given function and returns the peak traced memory in bytes.
+    """
+    tracemalloc.start()
+    result = func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Peak memory of assembling a long reply"
+    )
+    parser.add_argument(
+        "--seconds", type=float, default=120.0, help="Length of the reply in seconds"
+    )
+    parser.add_argument(
+        "--sentence-seconds",
+        type=float,
+        default=4.0,
+        help="Length of a single sentence",
+    )
+    args = parser.parse_args()
+
+    silence_samples = int(0.25 * SAMPLE_RATE)
+    capacity = int(args.seconds * SAMPLE_RATE)
+
+    def sentences():
+        return fake_sentences(args.seconds, args.sentence_seconds, SAMPLE_RATE)
+
+    baseline = measure(concatenate_pieces, sentences(), silence_samples)
+    buffered = measure(preallocated_buffer, sentences(), silence_samples, capacity)
+
+    print(f"Reply length:          {args.seconds:.0f} s at {SAMPLE_RATE} Hz")
+    print(f"pieces + concatenate:  {baseline / 1024**2:8.1f} MiB peak")
+    print(f"preallocated buffer:   {buffered / 1024**2:8.1f} MiB peak")
+    print(f"reduction:             {baseline / buffered:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
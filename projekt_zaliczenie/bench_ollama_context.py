@@ -0,0 +1,81 @@
+import argparse
+import requests
+from ollama_chat import OllamaConversation, SYSTEM_PROMPT
+
+TURNS = [
+    "Hi, my name is Anna.",
+    "What is a good name for a cat?",
+    "Why do cats purr?",
+    "Can you suggest a fun weekend activity?",
+    "What's the capital of Australia?",
+    "Give me a tip for learning to cook.",
+    "What did I say my name was?",
+    "Thanks, goodbye!",
+]
+
+
+def run_history(model: str, base_url: str, num_ctx: int) -> list:
+    """
+    Re-renders the whole transcript into every prompt, the way ConversationBufferMemory did.
+
+    Returns:
+        list: The prompt_eval_count of every turn.
+    """
+    session = requests.Session()
+    transcript: list[str] = []
+    counts = []
+    for text in TURNS:
+        history = "\n".join(transcript)
+        prompt = (
+            f"{SYSTEM_PROMPT}\n\nThe conversation transcript is as follows:\n{history}\n\n"
+            f"And here is the user's follow-up: {text}\n\nYour response:"
+        )
+        data = {
+            "model": model,
+            "prompt": prompt,
+            "stream": False,
+            "keep_alive": -1,
+            "options": {"num_ctx": num_ctx},
+        }
+        response = session.post(base_url + "/api/generate", json=data, timeout=300)
+        response.raise_for_status()
+        result = response.json()
+        transcript += [f"Human: {text}", f"Assistant: {result['response'].strip()}"]
+        counts.append(result.get("prompt_eval_count", 0))
+    return counts
+
+
+def run_context(model: str, base_url: str, num_ctx: int) -> list:
+    """
+    Carries Ollama's context from turn to turn with OllamaConversation.
+
+    Returns:
+        list: The prompt_eval_count of every turn.
+    """
+    conversation = OllamaConversation(model, base_url=base_url, num_ctx=num_ctx)
+    for text in TURNS:
+        conversation.send(text)
+    conversation.close()
+    return [stats["prompt_eval_count"] for stats in conversation.stats]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Prompt tokens evaluated per turn with and without Ollama's context"
+    )
+    parser.add_argument("--ollama-model", default="tinydolphin")
+    parser.add_argument("--ollama-url", default="http://localhost:11434")
+    parser.add_argument("--num-ctx", type=int, default=2048)
+    args = parser.parse_args()
+
+    history = run_history(args.ollama_model, args.ollama_url, args.num_ctx)
+    context = run_context(args.ollama_model, args.ollama_url, args.num_ctx)
+
+    print(f"{'turn':>4} {'history':>8} {'context':>8}")
+    for turn, (full, reused) in enumerate(zip(history, context), start=1):
+        print(f"{turn:>4} {full:>8} {reused:>8}")
+    print(f"{'sum':>4} {sum(history):>8} {sum(context):>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import io
+import json
+import time
+import argparse
+import numpy as np
+from evaluation import word_error_rate
+
+# Fixed sentence set, so that reports from different machines and versions are comparable
+SENTENCES = [
+    "Hello, how can I help you today?",
+    "The weather in London is cloudy with a chance of rain.",
+    "Please remind me to call the dentist at three o'clock.",
+    "I could not find any results for that search.",
+    "Your timer for ten minutes has started.",
+    "The quick brown fox jumps over the lazy dog.",
+]
+
+
+def model_size_mb(model) -> float:
+    """
+    Returns the size of the serialized model weights in megabytes.
+    """
+    import torch
+
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell() / 1024**2
+
+
+def resample(audio_array: np.ndarray, sample_rate: int, target_rate: int = 16000):
+    """
+    Resamples audio to the rate expected by Whisper.
+    """
+    from scipy.signal import resample_poly
+
+    divisor = np.gcd(sample_rate, target_rate)
+    return resample_poly(audio_array, target_rate // divisor, sample_rate // divisor)
+
+
+def evaluate_precision(precision: str, device: str, stt, seed: int) -> dict:
+    """
+    Synthesizes the fixed sentence set at the given precision and measures latency and intelligibility.
+
+    Intelligibility is measured as the word error rate of a Whisper transcript of the synthesized audio.
+
+    Args:
+        precision (str): The precision passed to TextToSpeechService.
+        device (str): The device passed to TextToSpeechService.
+        stt: A loaded Whisper model.
+        seed (int): The random seed set before every sentence.
+
+    Returns:
+        dict: The report for this precision.
+    """
+    import torch
+    from tts import TextToSpeechService
+
+    start = time.perf_counter()
+    tts = TextToSpeechService(device=device, precision=precision)
+    load_seconds = time.perf_counter() - start
+
+    sentences = []
+    for text in SENTENCES:
+        torch.manual_seed(seed)
+        start = time.perf_counter()
+        sample_rate, audio_array = tts.synthesize(text)
+        synthesis_seconds = time.perf_counter() - start
+
+        audio_seconds = len(audio_array) / sample_rate
+        transcript = stt.transcribe(
+            resample(audio_array, sample_rate).astype(np.float32), fp16=False
+        )["text"].strip()
+        sentences.append(
+            {
+                "text": text,
+                "transcript": transcript,
+                "wer": word_error_rate(text, transcript),
+                "synthesis_seconds": synthesis_seconds,
+                "audio_seconds": audio_seconds,
+                "real_time_factor": synthesis_seconds / audio_seconds,
+            }
+        )
+
+    return {
+        "precision": precision,
+        "device": device,
+        "load_seconds": load_seconds,
+        "model_mb": model_size_mb(tts.model),
+        "mean_synthesis_seconds": float(
+            np.mean([s["synthesis_seconds"] for s in sentences])
+        ),
+        "mean_real_time_factor": float(
+            np.mean([s["real_time_factor"] for s in sentences])
+        ),
+        "mean_wer": float(np.mean([s["wer"] for s in sentences])),
+        "sentences": sentences,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Quality and latency of the Bark precision modes"
+    )
+    parser.add_argument(
+        "--precisions",
+        nargs="+",
+        default=["fp32", "bf16", "int8"],
+        help="Precisions to compare",
+    )
+    parser.add_argument("--device", default="cpu", help="Device to run Bark on")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--json", help="Write the full report to this file")
+    args = parser.parse_args()
+
+    import whisper
+
+    stt = whisper.load_model("base.en", device="cpu")
+
+    reports = []
+    for precision in args.precisions:
+        print(f"Evaluating {precision}...", flush=True)
+        reports.append(evaluate_precision(precision, args.device, stt, args.seed))
+
+    print()
+    print(
+        f"{'precision':<10}{'load s':>8}{'size MB':>9}{'synth s':>9}{'RTF':>7}{'WER':>7}"
+    )
+    for report in reports:
+        print(
+            f"{report['precision']:<10}"
+            f"{report['load_seconds']:>8.1f}"
+            f"{report['model_mb']:>9.0f}"
+            f"{report['mean_synthesis_seconds']:>9.2f}"
+            f"{report['mean_real_time_factor']:>7.2f}"
+            f"{report['mean_wer']:>7.2f}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as report_file:
+            json.dump(reports, report_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
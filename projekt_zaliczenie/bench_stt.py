@@ -0,0 +1,252 @@
+import os
+import glob
+import json
+import time
+import argparse
+import subprocess
+import numpy as np
+from evaluation import word_error_rate
+from vad import trim_silence
+from bench_precision import model_size_mb
+
+# Short spoken commands, the typical input of the assistant
+COMMANDS = [
+    "What time is it?",
+    "Turn off the lights in the kitchen.",
+    "Set a timer for ten minutes.",
+    "What is the weather like tomorrow?",
+    "Play some relaxing music.",
+    "Remind me to call my mother at six.",
+    "How far is it to the airport?",
+    "Add milk and eggs to my shopping list.",
+]
+
+SAMPLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stt_samples")
+PIPER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "piper")
+
+
+def generate_samples(directory: str, piper_model: str):
+    """
+    Renders the command set with piper into WAV files, each next to a .txt file holding its reference text.
+
+    Args:
+        directory (str): The directory the samples are written to.
+        piper_model (str): The onnx voice, relative to the piper directory.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for index, text in enumerate(COMMANDS):
+        path = os.path.join(os.path.abspath(directory), f"command_{index:02d}")
+        subprocess.run(
+            ["./piper", "--model", piper_model, "--output_file", path + ".wav"],
+            cwd=PIPER_DIR,
+            input=text.encode("utf-8"),
+            stderr=subprocess.DEVNULL,
+            check=True,
+        )
+        with open(path + ".txt", "w") as reference_file:
+            reference_file.write(text + "\n")
+
+
+def load_samples(directory: str) -> list:
+    """
+    Loads every WAV file of a directory that has a reference transcript in a .txt file of the same name.
+
+    Returns:
+        list: (name, 16 kHz float32 audio, reference text) tuples, sorted by name.
+    """
+    import whisper
+
+    samples = []
+    for wav_path in sorted(glob.glob(os.path.join(directory, "*.wav"))):
+        reference_path = os.path.splitext(wav_path)[0] + ".txt"
+        if not os.path.exists(reference_path):
+            continue
+        with open(reference_path) as reference_file:
+            reference = reference_file.read().strip()
+        samples.append(
+            (os.path.basename(wav_path), whisper.load_audio(wav_path), reference)
+        )
+    return samples
+
+
+def time_encoder(model) -> list:
+    """
+    Records the duration of every forward pass of the Whisper encoder.
+
+    Returns:
+        list: The list the durations in seconds are appended to.
+    """
+    durations = []
+    started = []
+
+    def before(module, inputs):
+        started.append(time.perf_counter())
+
+    def after(module, inputs, output):
+        durations.append(time.perf_counter() - started.pop())
+
+    model.encoder.register_forward_pre_hook(before)
+    model.encoder.register_forward_hook(after)
+    return durations
+
+
+def evaluate(
+    model_name: str,
+    precision: str,
+    audio_context: str,
+    trim: bool,
+    device: str,
+    samples,
+) -> dict:
+    """
+    Transcribes the samples with the given settings and measures latency and accuracy.
+
+    Args:
+        model_name (str): The Whisper model to load.
+        precision (str): The precision passed to SpeechToTextService.
+        audio_context (str): The audio context passed to SpeechToTextService.
+        trim (bool): Whether leading and trailing silence is trimmed before transcription.
+        device (str): The device passed to SpeechToTextService.
+        samples (list): The samples from load_samples.
+
+    Returns:
+        dict: The report for these settings.
+    """
+    from stt import SpeechToTextService
+
+    start = time.perf_counter()
+    stt = SpeechToTextService(
+        model_name, device=device, precision=precision, audio_context=audio_context
+    )
+    load_seconds = time.perf_counter() - start
+
+    # The first call pays for one-off initialization, keep it out of the measurements
+    stt.transcribe(samples[0][1])
+    encoder_durations = time_encoder(stt.model)
+
+    results = []
+    for name, audio, reference in samples:
+        audio_seconds = len(audio) / 16000
+        encoder_durations.clear()
+        start = time.perf_counter()
+        if trim:
+            audio = trim_silence(audio)
+        transcript = stt.transcribe(audio)["text"].strip()
+        seconds = time.perf_counter() - start
+        results.append(
+            {
+                "file": name,
+                "reference": reference,
+                "transcript": transcript,
+                "wer": word_error_rate(reference, transcript),
+                "seconds": seconds,
+                "encoder_seconds": sum(encoder_durations),
+                "trimmed_seconds": len(audio) / 16000,
+                "real_time_factor": seconds / audio_seconds,
+            }
+        )
+
+    return {
+        "precision": precision,
+        "audio_context": audio_context,
+        "trim": trim,
+        "device": device,
+        "load_seconds": load_seconds,
+        "model_mb": model_size_mb(stt.model),
+        "mean_seconds": float(np.mean([r["seconds"] for r in results])),
+        "mean_encoder_seconds": float(np.mean([r["encoder_seconds"] for r in results])),
+        "mean_real_time_factor": float(
+            np.mean([r["real_time_factor"] for r in results])
+        ),
+        "mean_wer": float(np.mean([r["wer"] for r in results])),
+        "files": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Accuracy and latency of the Whisper precision and audio context modes"
+    )
+    parser.add_argument(
+        "--precisions",
+        nargs="+",
+        default=["fp32", "int8"],
+        help="Precisions to compare",
+    )
+    parser.add_argument(
+        "--audio-contexts",
+        nargs="+",
+        default=["full"],
+        help="Audio contexts to compare, full and/or dynamic",
+    )
+    parser.add_argument(
+        "--trim",
+        action="store_true",
+        help="Trim leading and trailing silence before transcription",
+    )
+    parser.add_argument("--model", default="base.en", help="Whisper model")
+    parser.add_argument("--device", default="cpu", help="Device to run Whisper on")
+    parser.add_argument(
+        "--samples",
+        default=SAMPLES_DIR,
+        help="Directory of WAV files with reference transcripts in .txt files",
+    )
+    parser.add_argument(
+        "--generate",
+        action="store_true",
+        help="Render the command set with piper into the samples directory first",
+    )
+    parser.add_argument(
+        "--piper-model",
+        default="en_GB-cori-medium.onnx",
+        help="Piper voice used by --generate",
+    )
+    parser.add_argument("--json", help="Write the full report to this file")
+    args = parser.parse_args()
+
+    if args.generate:
+        generate_samples(args.samples, args.piper_model)
+    samples = load_samples(args.samples)
+    if not samples:
+        parser.error(f"No WAV files with reference transcripts in {args.samples}")
+
+    reports = []
+    for precision in args.precisions:
+        for audio_context in args.audio_contexts:
+            print(
+                f"Evaluating {precision} with a {audio_context} context...", flush=True
+            )
+            reports.append(
+                evaluate(
+                    args.model,
+                    precision,
+                    audio_context,
+                    args.trim,
+                    args.device,
+                    samples,
+                )
+            )
+
+    print()
+    print(
+        f"{'precision':<10}{'context':<9}{'load s':>8}{'size MB':>9}{'latency s':>11}{'encoder s':>11}{'RTF':>7}{'WER':>7}"
+    )
+    for report in reports:
+        print(
+            f"{report['precision']:<10}"
+            f"{report['audio_context']:<9}"
+            f"{report['load_seconds']:>8.1f}"
+            f"{report['model_mb']:>9.0f}"
+            f"{report['mean_seconds']:>11.2f}"
+            f"{report['mean_encoder_seconds']:>11.3f}"
+            f"{report['mean_real_time_factor']:>7.2f}"
+            f"{report['mean_wer']:>7.2f}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as report_file:
+            json.dump(reports, report_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import sys
+import argparse
+import numpy as np
+from vad import trim_silence
+from transcript_cache import TranscriptCache, Fingerprint, fingerprint, distance
+
+SAMPLE_RATE = 16000
+
+# Formants of a few English vowels, band limits of fricatives and of stop bursts, all in Hz
+VOWELS = {
+    "a": (730, 1090, 2440),
+    "i": (270, 2290, 3010),
+    "u": (300, 870, 2240),
+    "e": (530, 1840, 2480),
+    "o": (570, 840, 2410),
+    "ae": (660, 1720, 2410),
+    "er": (490, 1350, 1690),
+    "uh": (640, 1190, 2390),
+}
+FRICATIVES = {
+    "s": (4000, 7500),
+    "sh": (2000, 4000),
+    "f": (1000, 7000),
+    "h": (500, 3000),
+}
+STOPS = {"p": (300, 1500), "t": (3500, 7000), "k": (1500, 3500)}
+PHONEMES = list(VOWELS) + list(FRICATIVES) + list(STOPS)
+
+
+def _ramp(n: int, ramp_seconds: float) -> np.ndarray:
+    t = np.arange(n)
+    return np.minimum(1.0, np.minimum(t, n - t) / (ramp_seconds * SAMPLE_RATE))
+
+
+def _band_noise(rng: np.random.Generator, n: int, band: tuple[int, int]) -> np.ndarray:
+    spectrum = np.fft.rfft(rng.standard_normal(n))
+    freqs = np.fft.rfftfreq(n, 1 / SAMPLE_RATE)
+    spectrum[(freqs < band[0]) | (freqs > band[1])] = 0
+    return np.fft.irfft(spectrum, n)
+
+
+def render(
+    word: list[str], rng: np.random.Generator, f0: float = 140.0, rate: float = 1.0
+) -> np.ndarray:
+    """
+    Synthesizes a speech-like word: voiced vowels with formants, band-noise fricatives and stops.
+
+    Args:
+        word (list): Phonemes from PHONEMES.
+        rng (numpy.random.Generator): The source of the noise.
+        f0 (float, optional): The pitch of the vowels. Defaults to 140.
+        rate (float, optional): The speaking rate, 1 is 0.16 s per vowel. Defaults to 1.
+
+    Returns:
+        numpy.ndarray: The audio, normalized to a peak of 0.5.
+    """
+    pieces = []
+    for phoneme in word:
+        if phoneme in VOWELS:
+            n = int(0.16 * SAMPLE_RATE / rate)
+            t = np.arange(n)
+            pitch = f0 * (1 + 0.05 * np.sin(2 * np.pi * 3 * t / SAMPLE_RATE))
+            phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+            vowel = np.zeros(n)
+            for harmonic in range(1, int(4000 / f0)):
+                gain = sum(
+                    1
+                    / (1 + ((harmonic * f0 - formant) / (90 * (i + 1))) ** 2)
+                    / (i + 1)
+                    for i, formant in enumerate(VOWELS[phoneme])
+                )
+                vowel += gain * np.sin(harmonic * phase)
+            pieces.append(vowel * _ramp(n, 0.02))
+        elif phoneme in FRICATIVES:
+            n = int(0.1 * SAMPLE_RATE / rate)
+            noise = _band_noise(rng, n, FRICATIVES[phoneme])
+            pieces.append(0.3 * noise * _ramp(n, 0.01))
+        else:
+            gap = int(0.04 * SAMPLE_RATE / rate)
+            burst = _band_noise(rng, int(0.02 * SAMPLE_RATE / rate), STOPS[phoneme])
+            pieces.append(np.concatenate([np.zeros(gap), 0.5 * burst]))
+    audio = np.concatenate(pieces)
+    return (audio / np.abs(audio).max() * 0.5).astype(np.float32)
+
+
+def record(
+    word: list[str],
+    rng: np.random.Generator,
+    repeat: bool = False,
+    snr_db: float | None = None,
+) -> np.ndarray:
+    """
+    Returns one utterance of a word the way transcribe() sees it: at a random level, with silence around it,
+    optionally with noise, trimmed by the VAD. A repeat is spoken at a different pitch and rate.
+    """
+    if repeat:
+        audio = render(
+            word, rng, f0=140 * rng.uniform(0.9, 1.1), rate=rng.uniform(0.88, 1.12)
+        )
+    else:
+        audio = render(word, rng)
+    audio = audio * rng.uniform(0.1, 3.0)
+    lead = np.zeros(int(rng.uniform(0.05, 0.3) * SAMPLE_RATE), dtype=np.float32)
+    tail = np.zeros(int(0.3 * SAMPLE_RATE), dtype=np.float32)
+    audio = np.concatenate([lead, audio, tail])
+    if snr_db is not None:
+        power = np.mean(audio**2)
+        audio = audio + rng.standard_normal(len(audio)) * np.sqrt(
+            power / 10 ** (snr_db / 10)
+        )
+    return trim_silence(audio.astype(np.float32))
+
+
+def match_distance(a: Fingerprint, b: Fingerprint, cache: TranscriptCache) -> float:
+    """
+    Returns the distance the cache compares to its threshold, or 1 if the length gate rejects the pair.
+    """
+    longer = max(a.active_frames, b.active_frames)
+    if abs(a.active_frames - b.active_frames) > cache.duration_tolerance * longer:
+        return 1.0
+    return distance(a, b)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Separation of same-word and different-word fingerprint distances of TranscriptCache"
+    )
+    parser.add_argument("--words", type=int, default=80)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=None,
+        help="Threshold to check; defaults to the one of TranscriptCache",
+    )
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    cache = TranscriptCache()
+    if args.threshold is not None:
+        cache.threshold = args.threshold
+
+    words = [
+        [PHONEMES[i] for i in rng.integers(0, len(PHONEMES), rng.integers(3, 6))]
+        for _ in range(args.words)
+    ]
+    references = [fingerprint(record(word, rng)) for word in words]
+    variants = {
+        "level only": dict(repeat=False, snr_db=None),
+        "30 dB noise": dict(repeat=False, snr_db=30.0),
+        "repeat, 30 dB noise": dict(repeat=True, snr_db=30.0),
+        "repeat, 20 dB noise": dict(repeat=True, snr_db=20.0),
+    }
+    same = {
+        name: np.array(
+            [
+                match_distance(
+                    reference, fingerprint(record(word, rng, **variant)), cache
+                )
+                for word, reference in zip(words, references)
+            ]
+        )
+        for name, variant in variants.items()
+    }
+    different = np.array(
+        [
+            match_distance(references[i], references[j], cache)
+            for i in range(len(words))
+            for j in range(i + 1, len(words))
+        ]
+    )
+
+    print(f"{len(words)} synthetic words, {len(different)} different-word pairs")
+    print(f"{'same word':<22} {'p50':>6} {'p95':>6} {'max':>6}")
+    for name, distances in same.items():
+        print(
+            f"{name:<22} {np.median(distances):6.3f} {np.percentile(distances, 95):6.3f} "
+            f"{distances.max():6.3f}"
+        )
+    compared = different[different < 1.0]
+    print(
+        f"different words: min {different.min():.3f}, p1 {np.percentile(compared, 1):.3f} "
+        f"of {len(compared)} pairs passing the length gate"
+    )
+
+    print(
+        f"\n{'threshold':>9} {'false':>6} " + " ".join(f"{name:>20}" for name in same)
+    )
+    for threshold in sorted({0.06, 0.08, 0.1, 0.12, 0.15, cache.threshold}):
+        false_matches = int((different <= threshold).sum())
+        hit_rates = " ".join(
+            f"{np.mean(distances <= threshold):20.2f}" for distances in same.values()
+        )
+        print(f"{threshold:9.2f} {false_matches:6d} {hit_rates}")
+
+    # A steady tone and a chirp of the same length must be neither cached nor matched
+    t = np.arange(int(0.6 * SAMPLE_RATE)) / SAMPLE_RATE
+    tone = 0.3 * np.sin(2 * np.pi * 500 * t).astype(np.float32)
+    chirp = 0.3 * np.sin(2 * np.pi * (500 + 100 * t) * t).astype(np.float32)
+    cache.put(chirp, "stop")
+    tone_matched = cache.get(tone) is not None
+    print(
+        f"\ntone coverage {fingerprint(tone).coverage:.2f} (cached from {cache.min_coverage:.2f}), "
+        f"tone-chirp distance {distance(fingerprint(tone), fingerprint(chirp)):.3f}"
+    )
+
+    false_matches = int((different <= cache.threshold).sum())
+    hit_rate = np.mean(same["repeat, 30 dB noise"] <= cache.threshold)
+    print(
+        f"threshold {cache.threshold:.2f}: {false_matches} false matches, "
+        f"{hit_rate:.0%} of repeats in 30 dB noise found"
+        + (", the tone matched the chirp" if tone_matched else "")
+    )
+    if false_matches or tone_matched:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
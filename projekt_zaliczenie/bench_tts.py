@@ -0,0 +1,294 @@
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import resource
+import platform
+import tempfile
+import subprocess
+
+# Fixed corpus, so that results from different machines and versions are comparable
+CORPUS = {
+    "short": "Hello, how can I help you today?",
+    "medium": (
+        "The weather in London is cloudy with a chance of rain. "
+        "You might want to take an umbrella. "
+        "Temperatures will stay around twelve degrees."
+    ),
+    "long": (
+        "Here is a quick summary of your day. "
+        "You have a meeting with the design team at ten o'clock. "
+        "After lunch, there is a call with the client about the new release. "
+        "Please remember to send the quarterly report before five. "
+        "Your package is expected to arrive in the afternoon. "
+        "The gym closes early today, at seven in the evening. "
+        "Tomorrow looks a little quieter, with only one meeting in the morning. "
+        "Let me know if you would like me to set any reminders."
+    ),
+}
+
+PIPER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "piper")
+
+
+def text_result(
+    name: str,
+    text: str,
+    first_sample_seconds: float | None,
+    total_seconds: float,
+    samples: int,
+    sample_rate: int,
+) -> dict:
+    audio_seconds = samples / sample_rate
+    return {
+        "text": name,
+        "characters": len(text),
+        "time_to_first_sample": first_sample_seconds,
+        "total_seconds": total_seconds,
+        "audio_seconds": audio_seconds,
+        "real_time_factor": total_seconds / audio_seconds if audio_seconds else None,
+        "samples_per_second": samples / total_seconds,
+    }
+
+
+def bench_bark(precision: str, batch_size: int = 1) -> dict:
+    """
+    Runs the corpus through the Bark TextToSpeechService, streaming sentence by sentence.
+
+    With a batch size above 1, every text is synthesized at once by long_form_synthesize, which generates
+    sentences of similar length together. Nothing can be played before the whole text is done, so the time to
+    the first sample equals the total time.
+
+    Args:
+        precision (str): The precision passed to TextToSpeechService.
+        batch_size (int, optional): The batch size passed to long_form_synthesize; 1 streams. Defaults to 1.
+
+    Returns:
+        dict: The load time and the per-text results.
+    """
+    from tts import TextToSpeechService
+
+    start = time.perf_counter()
+    tts = TextToSpeechService(precision=precision)
+    load_seconds = time.perf_counter() - start
+
+    results = []
+    for name, text in CORPUS.items():
+        first_sample_seconds = None
+        samples = 0
+        start = time.perf_counter()
+        if batch_size > 1:
+            sample_rate, audio_array = tts.long_form_synthesize(
+                text, batch_size=batch_size
+            )
+            samples = len(audio_array)
+            first_sample_seconds = time.perf_counter() - start
+        else:
+            for sample_rate, audio_array in tts.stream_synthesize(text):
+                if first_sample_seconds is None:
+                    first_sample_seconds = time.perf_counter() - start
+                samples += len(audio_array)
+        total_seconds = time.perf_counter() - start
+        results.append(
+            text_result(
+                name, text, first_sample_seconds, total_seconds, samples, sample_rate
+            )
+        )
+
+    peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "engine": f"bark-{precision}"
+        + (f"-batch{batch_size}" if batch_size > 1 else ""),
+        "load_seconds": load_seconds,
+        "peak_rss_mb": peak_rss_kb / 1024,
+        "results": results,
+    }
+
+
+def run_piper(model_path: str, text: str):
+    """
+    Synthesizes text with a fresh piper process in raw output mode.
+
+    Returns:
+        tuple: The time to the first output byte (or None), the total time, the number of samples
+        and the peak RSS of the process in kilobytes.
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        ["./piper", "--model", model_path, "--output-raw"],
+        cwd=PIPER_DIR,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    assert process.stdin is not None and process.stdout is not None
+    process.stdin.write((text + "\n").encode("utf-8"))
+    process.stdin.close()
+
+    first_byte_seconds = None
+    received = 0
+    while True:
+        chunk = os.read(process.stdout.fileno(), 65536)
+        if not chunk:
+            break
+        if first_byte_seconds is None:
+            first_byte_seconds = time.perf_counter() - start
+        received += len(chunk)
+    total_seconds = time.perf_counter() - start
+
+    # wait4 reports the resource usage of this particular child
+    _, status, rusage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return first_byte_seconds, total_seconds, received // 2, rusage.ru_maxrss
+
+
+def bench_piper(model_path: str) -> dict:
+    """
+    Runs the corpus through the piper binary, one process per text.
+
+    The time to first sample includes loading the voice; load_seconds reports the cost of loading it alone.
+
+    Args:
+        model_path (str): The onnx voice, relative to the piper directory.
+
+    Returns:
+        dict: The load time and the per-text results.
+    """
+    with open(os.path.join(PIPER_DIR, model_path + ".json")) as config_file:
+        sample_rate = json.load(config_file)["audio"]["sample_rate"]
+
+    _, load_seconds, _, peak_rss_kb = run_piper(model_path, "")
+
+    results = []
+    for name, text in CORPUS.items():
+        first_sample_seconds, total_seconds, samples, rss_kb = run_piper(
+            model_path, text
+        )
+        peak_rss_kb = max(peak_rss_kb, rss_kb)
+        results.append(
+            text_result(
+                name, text, first_sample_seconds, total_seconds, samples, sample_rate
+            )
+        )
+
+    return {
+        "engine": f"piper-{os.path.splitext(model_path)[0]}",
+        "load_seconds": load_seconds,
+        "peak_rss_mb": peak_rss_kb / 1024,
+        "results": results,
+    }
+
+
+def run_engine(engine: str, args) -> dict:
+    if engine == "bark":
+        return bench_bark(args.bark_precision, args.bark_batch_size)
+    if engine == "piper":
+        return bench_piper(args.piper_model)
+    raise ValueError(f"Unknown engine {engine!r}")
+
+
+def run_engine_isolated(engine: str, args) -> dict:
+    """
+    Runs a single engine in a fresh interpreter, so that its peak RSS is not mixed up with other engines.
+    """
+    with tempfile.NamedTemporaryFile(suffix=".json") as output:
+        subprocess.run(
+            [
+                sys.executable,
+                os.path.abspath(__file__),
+                "--engines",
+                engine,
+                "--bark-precision",
+                args.bark_precision,
+                "--bark-batch-size",
+                str(args.bark_batch_size),
+                "--piper-model",
+                args.piper_model,
+                "--json",
+                output.name,
+                "--quiet",
+            ],
+            check=True,
+        )
+        return json.load(output)["engines"][0]
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Real-time factor benchmark for TTS engines"
+    )
+    parser.add_argument(
+        "--engines", nargs="+", default=["bark", "piper"], choices=["bark", "piper"]
+    )
+    parser.add_argument(
+        "--bark-precision", default="fp32", choices=["fp32", "bf16", "int8"]
+    )
+    parser.add_argument(
+        "--bark-batch-size",
+        type=int,
+        default=1,
+        help="Synthesize whole texts with long_form_synthesize, generating this many sentences together; "
+        "1 streams sentence by sentence",
+    )
+    parser.add_argument(
+        "--piper-model",
+        default="en_GB-cori-medium.onnx",
+        help="Piper voice in the piper directory",
+    )
+    parser.add_argument("--json", help="Write the machine-readable report to this file")
+    parser.add_argument(
+        "--quiet", action="store_true", help="Do not print the summary table"
+    )
+    args = parser.parse_args()
+
+    if len(args.engines) == 1:
+        engines = [run_engine(args.engines[0], args)]
+    else:
+        engines = [run_engine_isolated(engine, args) for engine in args.engines]
+
+    report = {
+        "revision": git_revision(),
+        "host": socket.gethostname(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "engines": engines,
+    }
+
+    if not args.quiet:
+        print(
+            f"{'engine':<28}{'text':<8}{'TTFS s':>8}{'total s':>9}{'RTF':>7}{'samples/s':>11}{'RSS MB':>8}"
+        )
+        for engine in engines:
+            for result in engine["results"]:
+                rtf = result["real_time_factor"]
+                print(
+                    f"{engine['engine']:<28}{result['text']:<8}"
+                    f"{result['time_to_first_sample'] or float('nan'):>8.2f}"
+                    f"{result['total_seconds']:>9.2f}"
+                    f"{rtf if rtf is not None else float('nan'):>7.2f}"
+                    f"{result['samples_per_second']:>11.0f}"
+                    f"{engine['peak_rss_mb']:>8.0f}"
+                )
+
+    if args.json:
+        with open(args.json, "w") as report_file:
+            json.dump(report, report_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+import re
+import math
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from langchain.memory.prompt import SUMMARY_PROMPT
+from langchain_core.language_models import BaseLanguageModel
+from langchain_core.memory import BaseMemory
+from langchain_core.pydantic_v1 import PrivateAttr
+
+logger = logging.getLogger(__name__)
+
+_PIECES = re.compile(r"\w+|[^\w\s]")
+SUMMARY_PREFIX = "Summary of the earlier conversation: "
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Roughly estimates the number of Llama tokens of a text without loading a tokenizer: every punctuation
+    mark is one token and a word is one token per four characters.
+
+    Args:
+        text (str): The text to be measured.
+
+    Returns:
+        int: The estimated number of tokens.
+    """
+    return sum(math.ceil(len(piece) / 4) for piece in _PIECES.findall(text))
+
+
+class TokenBudgetMemory(BaseMemory):
+    """
+    Conversation memory whose {history} never exceeds a fixed number of tokens.
+
+    The most recent turns are kept verbatim in a sliding window. When the window exceeds its budget, the oldest
+    turns are folded into a running summary with one call to the language model, so earlier context is kept
+    in condensed form. The summary is written in a background thread, so the reply that triggered it is not
+    held up by a second generation; until it lands, the evicted turns stay in the history verbatim and are
+    counted in `history_tokens`. The token count of every turn is computed once, when it is saved, so checking the
+    budget does not re-tokenize the history.
+
+    `max_tokens` is counted with `token_counter`, by default a tokenizer-free estimate; `summary_share` of it is
+    reserved for the summary.
+    """
+
+    llm: BaseLanguageModel
+    max_tokens: int = 512
+    summary_share: float = 0.25
+    token_counter: Callable[[str], int] = estimate_tokens
+    human_prefix: str = "Human"
+    ai_prefix: str = "Assistant"
+    memory_key: str = "history"
+    input_key: str = "input"
+    summary: str = ""
+    summary_token_count: int = 0
+    turns: List[Tuple[str, int]] = []
+    # Turns evicted from the window whose summary is still being written
+    pending: List[Tuple[str, int]] = []
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _summarizer: Optional[threading.Thread] = PrivateAttr(default=None)
+
+    @property
+    def memory_variables(self) -> List[str]:
+        return [self.memory_key]
+
+    @property
+    def summary_tokens(self) -> int:
+        return int(self.max_tokens * self.summary_share)
+
+    @property
+    def window_tokens(self) -> int:
+        return self.max_tokens - self.summary_tokens
+
+    @property
+    def history_tokens(self) -> int:
+        """The number of tokens the history takes up in the prompt."""
+        with self._lock:
+            return self.summary_token_count + sum(
+                count for _, count in self.pending + self.turns
+            )
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, str]:
+        with self._lock:
+            lines = [text for text, _ in self.pending + self.turns]
+            if self.summary:
+                lines.insert(0, SUMMARY_PREFIX + self.summary)
+        return {self.memory_key: "\n".join(lines)}
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        output = next(iter(outputs.values())).strip()
+        if output.startswith(f"{self.ai_prefix}:"):
+            output = output[len(self.ai_prefix) + 1 :].strip()
+        text = (
+            f"{self.human_prefix}: {inputs[self.input_key]}\n{self.ai_prefix}: {output}"
+        )
+        turn = self._fit(text, self.window_tokens)
+        with self._lock:
+            self.turns.append(turn)
+            self._prune()
+
+    def clear(self) -> None:
+        with self._lock:
+            self.summary = ""
+            self.summary_token_count = 0
+            self.turns = []
+            self.pending = []
+
+    def wait_for_summary(self, timeout: Optional[float] = None) -> None:
+        """
+        Waits until the summary that is being written in the background, if any, has landed.
+
+        Args:
+            timeout (float, optional): Seconds to wait at most. Defaults to None, which waits indefinitely.
+
+        Returns:
+            None
+        """
+        summarizer = self._summarizer
+        if summarizer is not None:
+            summarizer.join(timeout)
+
+    def _fit(self, text: str, budget: int) -> Tuple[str, int]:
+        """
+        Returns the text with its token count, dropping its beginning if it does not fit into the budget.
+        """
+        count = self.token_counter(text)
+        if count <= budget:
+            return text, count
+        words = text.split()
+        # Estimates the cut, then corrects it word by word
+        start = max(0, len(words) - len(words) * budget // count)
+        while True:
+            clipped = " ".join(words[start:])
+            count = self.token_counter(clipped)
+            if count <= budget or start == len(words):
+                return clipped, count
+            start += 1
+
+    def _prune(self) -> None:
+        """
+        Moves the oldest turns out of the window once it exceeds its budget and starts folding them into the
+        summary in the background. Called with the lock held.
+
+        The window is pruned down to half its budget, so the summary is updated every few turns rather than
+        on every turn.
+        """
+        window = sum(count for _, count in self.turns)
+        if window <= self.window_tokens:
+            return
+        # The latest turn always stays verbatim
+        while len(self.turns) > 1 and window > self.window_tokens // 2:
+            text, count = self.turns.pop(0)
+            self.pending.append((text, count))
+            window -= count
+        if self._summarizer is None:
+            self._summarizer = threading.Thread(target=self._summarize, daemon=True)
+            self._summarizer.start()
+
+    def _summarize(self) -> None:
+        """
+        Folds the pending turns into the summary until none are left, including turns evicted meanwhile.
+        """
+        while True:
+            with self._lock:
+                evicted = list(self.pending)
+                summary = self.summary
+                if not evicted:
+                    self._summarizer = None
+                    return
+            try:
+                result = self.llm.invoke(
+                    SUMMARY_PROMPT.format(
+                        summary=summary,
+                        new_lines="\n".join(text for text, _ in evicted),
+                    )
+                )
+            except Exception as e:
+                # The turns stay pending and are summarized with the next eviction
+                logger.error("Failed to summarize the conversation: %s", e)
+                with self._lock:
+                    self._summarizer = None
+                return
+            # A chat model returns a message, a plain LLM a string
+            new_summary = getattr(result, "content", result).strip()
+            prefix_tokens = self.token_counter(SUMMARY_PREFIX)
+            new_summary, count = self._fit(
+                new_summary, self.summary_tokens - prefix_tokens
+            )
+            with self._lock:
+                # Unless the memory was cleared meanwhile
+                if self.pending[: len(evicted)] == evicted:
+                    del self.pending[: len(evicted)]
+                    self.summary = new_summary
+                    self.summary_token_count = count + prefix_tokens
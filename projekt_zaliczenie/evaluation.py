@@ -0,0 +1,43 @@
+import re
+
+
+def normalize_words(text: str) -> list:
+    """
+    Splits text into lowercase words without punctuation, the form in which transcripts are compared.
+
+    Args:
+        text (str): The text to be normalized.
+
+    Returns:
+        list: The normalized words.
+    """
+    return re.findall(r"[a-z0-9']+", text.lower())
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """
+    Computes the word error rate of a hypothesis against a reference transcript.
+
+    Args:
+        reference (str): The expected text.
+        hypothesis (str): The recognized text.
+
+    Returns:
+        float: The number of word substitutions, deletions and insertions divided by the number of reference words.
+    """
+    ref = normalize_words(reference)
+    hyp = normalize_words(hypothesis)
+    if not ref:
+        return float(len(hyp) > 0)
+
+    # Levenshtein distance over words, keeping a single row of the table
+    row = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, start=1):
+        previous, row[0] = row[0], i
+        for j, hyp_word in enumerate(hyp, start=1):
+            previous, row[j] = row[j], min(
+                row[j] + 1,
+                row[j - 1] + 1,
+                previous + (ref_word != hyp_word),
+            )
+    return row[-1] / len(ref)
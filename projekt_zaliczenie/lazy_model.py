@@ -0,0 +1,56 @@
+import threading
+
+
+class LazyModel:
+    def __init__(self, loader):
+        """
+        Initializes the LazyModel class, a handle that loads a model on first use.
+
+        Attribute access is forwarded to the loaded model, so the handle can be used in place of the model itself.
+
+        Args:
+            loader (callable): A function without arguments that imports and returns the model.
+        """
+        self._loader = loader
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    def get(self):
+        """
+        Returns the model, loading it first if needed. Concurrent callers wait for a single load.
+
+        Returns:
+            object: The loaded model.
+        """
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self._loader()
+        return self._model
+
+    def warm_up(self) -> threading.Thread:
+        """
+        Starts loading the model in a background thread.
+
+        Errors are not raised here; a failed load is retried, and its error raised, on first use.
+
+        Returns:
+            threading.Thread: The loading thread.
+        """
+
+        def load():
+            try:
+                self.get()
+            except Exception:
+                pass
+
+        thread = threading.Thread(target=load, daemon=True)
+        thread.start()
+        return thread
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
@@ -0,0 +1,335 @@
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_RESPONSES = [
+    "Hello! How can I help you today?",
+    "Sure, here is a quick tip: keep a regular sleep schedule, even on weekends.",
+    "Pi is roughly 3.14159, e.g. a circle with a diameter of 1 m has a circumference of about 3.14 m.",
+    "The sky looks blue because air scatters short blue wavelengths much more than red ones. "
+    "At sunset, the light passes through more air, so the sky turns orange and red.",
+]
+
+_TOKENS = re.compile(
+    r"\n| ?[A-Za-z]{1,6}|[A-Za-z]{1,6}| ?\d{1,3}|'[a-z]+| ?[^\w\s]|\s+"
+)
+
+
+def tokenize(text: str) -> list:
+    """
+    Splits text into pieces of roughly the size of Llama tokens; joined, they give the text back.
+
+    Args:
+        text (str): The text to be split.
+
+    Returns:
+        list: The tokens.
+    """
+    return _TOKENS.findall(text)
+
+
+class MockOllamaServer(ThreadingHTTPServer):
+    """
+    A stand-in for the Ollama server with deterministic latency, for benchmarking the pipelines without an LLM.
+
+    It speaks enough of the Ollama API for app.py, app_piper.py, ollama_chat.py and piper/pipi*.py: GET
+    /api/version and /api/tags, and POST /api/generate with NDJSON streaming or a single JSON reply, the
+    `context` array, the timing fields of the final chunk and loading a model by a request without a prompt.
+    Replies are taken in turn from canned responses and split into Llama-like tokens. The first token arrives
+    after a fixed delay plus a time per evaluated prompt token; the others follow at a fixed interval.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 11434,
+        responses: list | None = None,
+        ttft_ms: float = 300.0,
+        token_ms: float = 30.0,
+        prompt_token_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        load_ms: float = 0.0,
+        seed: int = 0,
+    ):
+        """
+        Initializes the MockOllamaServer class and binds it; call start() or serve_forever() to serve.
+
+        Args:
+            host (str, optional): The address to listen on. Defaults to "127.0.0.1".
+            port (int, optional): The port to listen on; 0 picks a free one. Defaults to 11434.
+            responses (list, optional): Canned replies, used in turn. Defaults to DEFAULT_RESPONSES.
+            ttft_ms (float, optional): The delay before the first token. Defaults to 300.
+            token_ms (float, optional): The delay between tokens. Defaults to 30.
+            prompt_token_ms (float, optional): Added to the first-token delay per evaluated prompt token, so
+            re-sent history costs time. Defaults to 0.
+            jitter_ms (float, optional): The largest random deviation of every delay. Defaults to 0.
+            load_ms (float, optional): The delay of loading a model that has not been used yet. Defaults to 0.
+            seed (int, optional): The seed of the jitter, so runs are repeatable. Defaults to 0.
+        """
+        super().__init__((host, port), _Handler)
+        self.responses = responses or DEFAULT_RESPONSES
+        self.ttft = ttft_ms / 1000
+        self.token_interval = token_ms / 1000
+        self.prompt_token_seconds = prompt_token_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.load_seconds = load_ms / 1000
+        self._random = random.Random(seed)
+        self._next_response = 0
+        self._loaded: set[str] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        if isinstance(host, bytes):
+            host = host.decode()
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockOllamaServer":
+        """
+        Serves in a daemon thread and returns the server; stop it with shutdown().
+        """
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def delay(self, seconds: float) -> float:
+        with self._lock:
+            seconds += self._random.uniform(-self.jitter, self.jitter)
+        return max(seconds, 0.0)
+
+    def next_response(self) -> str:
+        with self._lock:
+            response = self.responses[self._next_response % len(self.responses)]
+            self._next_response += 1
+        return response
+
+    def load(self, model: str) -> float:
+        """
+        Returns the time loading the model takes, which is paid only on its first use.
+        """
+        with self._lock:
+            if model in self._loaded:
+                return 0.0
+            self._loaded.add(model)
+        return self.load_seconds
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real server
+    server: MockOllamaServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == "/api/version":
+            self._send_json({"version": "0.0.0-mock"})
+        elif self.path == "/api/tags":
+            models = [{"name": model} for model in sorted(self.server._loaded)]
+            self._send_json({"models": models})
+        elif self.path == "/":
+            self._send_body(b"Ollama is running", "text/plain")
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_json({"error": "invalid JSON"}, status=400)
+            return
+        if self.path != "/api/generate":
+            self._send_json({"error": "not found"}, status=404)
+            return
+        if not request.get("model"):
+            self._send_json({"error": "model is required"}, status=400)
+            return
+        self._generate(request)
+
+    def _generate(self, request: dict):
+        server = self.server
+        start = time.perf_counter()
+        model = request["model"]
+        load_seconds = server.load(model)
+        time.sleep(load_seconds)
+
+        prompt = request.get("prompt") or ""
+        if not prompt:
+            # A request without a prompt only loads the model
+            self._send_json(
+                {
+                    "model": model,
+                    "created_at": _timestamp(),
+                    "response": "",
+                    "done": True,
+                    "done_reason": "load",
+                }
+            )
+            return
+
+        context = list(request.get("context") or [])
+        system = (request.get("system") or "") if not context else ""
+        prompt_tokens = len(tokenize(system)) + len(tokenize(prompt))
+        tokens = tokenize(server.next_response())
+        first_token_delay = server.delay(
+            server.ttft + prompt_tokens * server.prompt_token_seconds
+        )
+        delays = [first_token_delay] + [
+            server.delay(server.token_interval) for _ in tokens[1:]
+        ]
+
+        def final_chunk() -> dict:
+            total = time.perf_counter() - start
+            return {
+                "model": model,
+                "created_at": _timestamp(),
+                "response": "",
+                "done": True,
+                "done_reason": "stop",
+                # Token ids are meaningless here; only the length of the context matters
+                "context": context + list(range(prompt_tokens + len(tokens))),
+                "total_duration": int(total * 1e9),
+                "load_duration": int(load_seconds * 1e9),
+                "prompt_eval_count": prompt_tokens,
+                "prompt_eval_duration": int(first_token_delay * 1e9),
+                "eval_count": len(tokens),
+                "eval_duration": int(sum(delays[1:]) * 1e9),
+            }
+
+        if request.get("stream", True) is False:
+            time.sleep(sum(delays))
+            reply = final_chunk()
+            reply["response"] = "".join(tokens)
+            self._send_json(reply)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for token, delay in zip(tokens, delays):
+                time.sleep(delay)
+                chunk = {
+                    "model": model,
+                    "created_at": _timestamp(),
+                    "response": token,
+                    "done": False,
+                }
+                self._write_chunk(chunk)
+            self._write_chunk(final_chunk())
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading, e.g. it was interrupted
+            self.close_connection = True
+
+    def _write_chunk(self, chunk: dict):
+        line = (json.dumps(chunk) + "\n").encode("utf-8")
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+        self.wfile.flush()
+
+    def _send_json(self, body: dict, status: int = 200):
+        self._send_body(json.dumps(body).encode("utf-8"), "application/json", status)
+
+    def _send_body(self, body: bytes, content_type: str, status: int = 200):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _timestamp() -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+
+def load_responses(path: str) -> list:
+    """
+    Reads canned replies from a file: JSON lines with a "response" field, or one plain-text reply per line.
+
+    Args:
+        path (str): The path of the file.
+
+    Returns:
+        list: The replies.
+    """
+    responses = []
+    with open(path, encoding="utf-8") as responses_file:
+        for line in responses_file:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                responses.append(json.loads(line)["response"])
+            else:
+                responses.append(line)
+    return responses
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Mock Ollama server with deterministic latency"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument(
+        "--responses",
+        help="File of canned replies, one per line or JSON lines with a response field",
+    )
+    parser.add_argument(
+        "--ttft-ms", type=float, default=300.0, help="Delay before the first token"
+    )
+    parser.add_argument(
+        "--token-ms", type=float, default=30.0, help="Delay between tokens"
+    )
+    parser.add_argument(
+        "--prompt-token-ms",
+        type=float,
+        default=0.0,
+        help="Extra first-token delay per evaluated prompt token",
+    )
+    parser.add_argument(
+        "--jitter-ms",
+        type=float,
+        default=0.0,
+        help="Largest random deviation of every delay",
+    )
+    parser.add_argument(
+        "--load-ms",
+        type=float,
+        default=0.0,
+        help="Delay of the first request for every model",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the jitter")
+    args = parser.parse_args()
+
+    server = MockOllamaServer(
+        args.host,
+        args.port,
+        responses=load_responses(args.responses) if args.responses else None,
+        ttft_ms=args.ttft_ms,
+        token_ms=args.token_ms,
+        prompt_token_ms=args.prompt_token_ms,
+        jitter_ms=args.jitter_ms,
+        load_ms=args.load_ms,
+        seed=args.seed,
+    )
+    print(f"Mock Ollama server listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import logging
+import requests
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = (
+    "You are a helpful and friendly AI assistant. You are polite, respectful, and aim to provide concise "
+    "responses of less than 20 words."
+)
+
+
+class OllamaConversation:
+    def __init__(
+        self,
+        model: str = "tinydolphin",
+        system: str = SYSTEM_PROMPT,
+        base_url: str = "http://localhost:11434",
+        num_ctx: int = 2048,
+        reset_ratio: float = 0.75,
+        carried_turns: int = 2,
+    ):
+        """
+        Initializes the OllamaConversation class, a conversation driver that carries the `context` token array
+        returned by Ollama's /api/generate from turn to turn.
+
+        Ollama keeps the evaluated tokens of the last request in its KV cache, so a follow-up that passes the
+        previous context only has to evaluate the new message instead of the whole rendered history. When the
+        context fills `reset_ratio` of the window, the conversation starts over with the system prompt and the
+        last `carried_turns` turns as text, which costs one full evaluation.
+
+        Args:
+            model (str, optional): The name of the Ollama model. Defaults to "tinydolphin".
+            system (str, optional): The system prompt, sent with the first turn of every context.
+            base_url (str, optional): The address of the Ollama server. Defaults to http://localhost:11434.
+            num_ctx (int, optional): The context window of the model in tokens. Defaults to 2048.
+            reset_ratio (float, optional): The fill level of the window that starts a new context.
+            Defaults to 0.75.
+            carried_turns (int, optional): The number of turns repeated in a new context. Defaults to 2.
+        """
+        self.model = model
+        self.system = system
+        self.url = base_url.rstrip("/") + "/api/generate"
+        self.num_ctx = num_ctx
+        self.reset_ratio = reset_ratio
+        self.carried_turns = carried_turns
+        self.session = requests.Session()
+        self.context: list[int] | None = None
+        self.turns: list[tuple[str, str]] = []
+        self.stats: list[dict] = []
+
+    def send(self, text: str) -> str:
+        """
+        Sends a user message and returns the reply, evaluating only the new message when a context is kept.
+
+        Args:
+            text (str): The user's message.
+
+        Returns:
+            str: The reply of the model.
+        """
+        data = {
+            "model": self.model,
+            "stream": False,
+            "keep_alive": -1,
+            "options": {"num_ctx": self.num_ctx},
+        }
+        if self.context:
+            data["prompt"] = text
+            data["context"] = self.context
+        else:
+            # A new context: the system prompt and the latest turns are evaluated once
+            recent = "\n".join(
+                f"User: {user}\nAssistant: {reply}"
+                for user, reply in self.turns[-self.carried_turns :]
+            )
+            data["system"] = self.system
+            data["prompt"] = f"{recent}\nUser: {text}" if recent else text
+
+        response = self.session.post(self.url, json=data, timeout=(3.05, 300))
+        response.raise_for_status()
+        result = response.json()
+        reply = result.get("response", "").strip()
+
+        self.context = result.get("context")
+        if self.context and len(self.context) >= self.reset_ratio * self.num_ctx:
+            self.context = None
+        self.turns.append((text, reply))
+
+        stats = {
+            "turn": len(self.turns),
+            "prompt_eval_count": result.get("prompt_eval_count", 0),
+            "prompt_eval_seconds": result.get("prompt_eval_duration", 0) / 1e9,
+            "eval_count": result.get("eval_count", 0),
+            "context_tokens": len(result.get("context") or []),
+        }
+        self.stats.append(stats)
+        logger.info(
+            "Turn %d: prompt eval %d tokens in %.3f s, %d tokens generated, context %d tokens",
+            stats["turn"],
+            stats["prompt_eval_count"],
+            stats["prompt_eval_seconds"],
+            stats["eval_count"],
+            stats["context_tokens"],
+        )
+        return reply
+
+    def reset(self):
+        """
+        Forgets the conversation.
+        """
+        self.context = None
+        self.turns = []
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,389 @@
+"""
+Long-lived speech recognition worker and its client.
+
+The worker loads the ASR model once and then serves requests for as long as it runs, instead of paying
+container exec, interpreter start and model load for every utterance. It talks to the client over its
+stdin and stdout, which also works through `docker exec -i`. Every message is a frame made of a 4-byte
+big-endian length followed by a UTF-8 JSON object with a "type" field:
+
+    client -> worker: listen, pause, ping {id}, shutdown
+    worker -> client: ready {load_seconds}, pong {id, uptime, transcripts},
+                      transcript {text, final}, error {message}
+
+Run `python3 asr_worker.py --backend standin` for a local stand-in worker that needs neither Docker nor a
+model, e.g. to try out pipi6.py and pipi7.py with --local-asr.
+"""
+
+import os
+import sys
+import json
+import time
+import struct
+import logging
+import argparse
+import threading
+import subprocess
+
+HEADER = struct.Struct(">I")
+MAX_FRAME_BYTES = 1024 * 1024
+WORKER_PATH = os.path.abspath(__file__)
+
+
+def write_frame(stream, message):
+    """Writes a single message to a binary stream."""
+    payload = json.dumps(message).encode("utf-8")
+    stream.write(HEADER.pack(len(payload)) + payload)
+    stream.flush()
+
+
+def read_exactly(stream, size):
+    data = b""
+    while len(data) < size:
+        chunk = stream.read(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def read_frame(stream):
+    """Reads a single message from a binary stream, or returns None when the stream is closed."""
+    header = read_exactly(stream, HEADER.size)
+    if header is None:
+        return None
+    (size,) = HEADER.unpack(header)
+    if size > MAX_FRAME_BYTES:
+        raise ValueError(f"Frame of {size} bytes exceeds the limit")
+    payload = read_exactly(stream, size)
+    if payload is None:
+        return None
+    return json.loads(payload.decode("utf-8"))
+
+
+# Worker side
+
+
+class JetsonVoiceBackend:
+    """Streaming ASR from jetson-voice, the library behind examples/asr.py in the container."""
+
+    def __init__(self, model, mic):
+        from jetson_voice import ASR, AudioInput
+
+        self.asr = ASR(model)
+        self.stream = AudioInput(
+            mic=mic, sample_rate=self.asr.sample_rate, chunk_size=self.asr.chunk_size
+        )
+
+    def run(self, listening, emit):
+        for samples in self.stream:
+            # Keep draining the microphone while paused, so no stale audio is transcribed on resume
+            if not listening.is_set():
+                continue
+            for result in self.asr(samples):
+                if result["text"].strip():
+                    emit(result["text"].strip(), bool(result["end"]))
+
+
+class StandInBackend:
+    """Emits scripted transcripts while listening; used to test the pipeline without Docker or a model."""
+
+    def __init__(self, phrases, interval, crash_after):
+        self.phrases = phrases
+        self.interval = interval
+        self.crash_after = crash_after
+
+    def run(self, listening, emit):
+        emitted = 0
+        while True:
+            for phrase in self.phrases:
+                listening.wait()
+                words = phrase.split()
+                for count in range(1, len(words) + 1):
+                    time.sleep(self.interval / len(words))
+                    emit(" ".join(words[:count]), count == len(words))
+                emitted += 1
+                if self.crash_after and emitted >= self.crash_after:
+                    logging.error("Stand-in worker crashing on purpose")
+                    os._exit(1)
+
+
+def serve(backend, load_seconds, requests, responses):
+    """Runs the worker: recognition in a background thread, requests handled until shutdown or EOF."""
+    write_lock = threading.Lock()
+    listening = threading.Event()
+    started = time.monotonic()
+    transcripts = 0
+
+    def send(message):
+        with write_lock:
+            write_frame(responses, message)
+
+    def emit(text, final):
+        nonlocal transcripts
+        transcripts += final
+        send({"type": "transcript", "text": text, "final": final})
+
+    def recognize():
+        try:
+            backend.run(listening, emit)
+        except Exception as e:
+            logging.exception("Recognition failed")
+            send({"type": "error", "message": str(e)})
+        # Without recognition the worker is useless, exit so that the client restarts it
+        os._exit(1)
+
+    threading.Thread(target=recognize, daemon=True).start()
+    send({"type": "ready", "load_seconds": load_seconds})
+
+    while True:
+        request = read_frame(requests)
+        if request is None or request["type"] == "shutdown":
+            break
+        if request["type"] == "listen":
+            listening.set()
+        elif request["type"] == "pause":
+            listening.clear()
+        elif request["type"] == "ping":
+            send(
+                {
+                    "type": "pong",
+                    "id": request.get("id"),
+                    "uptime": time.monotonic() - started,
+                    "transcripts": transcripts,
+                }
+            )
+        else:
+            send(
+                {
+                    "type": "error",
+                    "message": f"Unknown request type {request['type']!r}",
+                }
+            )
+
+
+def worker_main():
+    parser = argparse.ArgumentParser(
+        description="Resident ASR worker speaking the framed protocol on stdin/stdout"
+    )
+    parser.add_argument(
+        "--backend", default="jetson-voice", choices=["jetson-voice", "standin"]
+    )
+    parser.add_argument(
+        "--model", default="quartznet", help="ASR model of the jetson-voice backend"
+    )
+    parser.add_argument(
+        "--mic", default="11", help="Microphone device of the jetson-voice backend"
+    )
+    parser.add_argument(
+        "--phrases",
+        nargs="+",
+        default=["Hello there.", "What is the weather like today?"],
+        help="Transcripts of the stand-in backend",
+    )
+    parser.add_argument(
+        "--interval", type=float, default=2.0, help="Seconds per stand-in transcript"
+    )
+    parser.add_argument(
+        "--crash-after",
+        type=int,
+        default=0,
+        help="Make the stand-in exit after this many transcripts",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        stream=sys.stderr,
+        level=logging.INFO,
+        format="asr-worker %(levelname)s: %(message)s",
+    )
+
+    # The frames own the real stdout; anything the ASR libraries print goes to stderr instead
+    responses = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    requests = sys.stdin.buffer
+
+    start = time.monotonic()
+    if args.backend == "jetson-voice":
+        backend = JetsonVoiceBackend(args.model, args.mic)
+    else:
+        backend = StandInBackend(args.phrases, args.interval, args.crash_after)
+    load_seconds = time.monotonic() - start
+    logging.info(f"Backend {args.backend} loaded in {load_seconds:.1f}s")
+
+    serve(backend, load_seconds, requests, responses)
+
+
+# Client side
+
+
+def standin_command(*worker_args):
+    """Returns the command of a local stand-in worker."""
+    return [sys.executable, "-u", WORKER_PATH, "--backend", "standin", *worker_args]
+
+
+def docker_command(container, *worker_args, path="/tmp/asr_worker.py"):
+    """Copies the worker into a running container and returns the command that starts it there."""
+    subprocess.run(["docker", "cp", WORKER_PATH, f"{container}:{path}"], check=True)
+    return ["docker", "exec", "-i", container, "python3", "-u", path, *worker_args]
+
+
+class ASRWorker:
+    def __init__(
+        self,
+        command,
+        on_transcript,
+        stderr=None,
+        health_interval=2.0,
+        health_timeout=5.0,
+        ready_timeout=120.0,
+        max_restarts=5,
+    ):
+        """
+        Starts and supervises a resident ASR worker process.
+
+        A monitor thread pings the worker every `health_interval` seconds. When it exits or stops
+        answering, it is restarted with exponential backoff and put back into the listening state.
+
+        Args:
+            command (list): The command that starts the worker, e.g. from docker_command or standin_command.
+            on_transcript (callable): Called from a reader thread with the text and whether it is final.
+            stderr (file, optional): Where the worker's log goes. Defaults to the parent's stderr.
+            health_interval (float, optional): Seconds between health checks. Defaults to 2.
+            health_timeout (float, optional): Seconds to wait for a pong. Defaults to 5.
+            ready_timeout (float, optional): Seconds to wait for the model to load. Defaults to 120.
+            max_restarts (int, optional): Consecutive failed restarts before giving up. Defaults to 5.
+        """
+        self.command = command
+        self.on_transcript = on_transcript
+        self.stderr = stderr
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self.ready_timeout = ready_timeout
+        self.max_restarts = max_restarts
+
+        self.process = None
+        self.listening = False
+        self.restarts = 0
+        self.failed = False
+        self._write_lock = threading.Lock()
+        self._ping_lock = threading.Lock()
+        self._ready = threading.Event()
+        self._pong = threading.Event()
+        self._ping_id = 0
+        self._stopped = threading.Event()
+
+    def start(self):
+        """Starts the worker, waits until its model is loaded and starts health checks."""
+        if not self._spawn():
+            raise RuntimeError("ASR worker did not become ready")
+        threading.Thread(target=self._monitor, daemon=True).start()
+
+    def _spawn(self):
+        self._ready.clear()
+        self.process = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=self.stderr,
+            bufsize=0,
+        )
+        threading.Thread(
+            target=self._read_loop, args=(self.process,), daemon=True
+        ).start()
+        if not self._ready.wait(self.ready_timeout) or self.process.poll() is not None:
+            self._kill()
+            return False
+        logging.info(f"ASR worker {self.process.pid} ready")
+        if self.listening:
+            self._send({"type": "listen"})
+        return True
+
+    def _read_loop(self, process):
+        try:
+            while True:
+                message = read_frame(process.stdout)
+                if message is None:
+                    break
+                if message["type"] == "transcript":
+                    self.on_transcript(message["text"], message["final"])
+                elif message["type"] == "pong":
+                    if message.get("id") == self._ping_id:
+                        self._pong.set()
+                elif message["type"] == "ready":
+                    logging.info(f"ASR model loaded in {message['load_seconds']:.1f}s")
+                    self._ready.set()
+                elif message["type"] == "error":
+                    logging.error(f"ASR worker error: {message['message']}")
+        except (OSError, ValueError) as e:
+            logging.error(f"Broken ASR worker stream: {e}")
+        logging.warning(f"ASR worker {process.pid} closed its output")
+
+    def _send(self, message):
+        try:
+            with self._write_lock:
+                write_frame(self.process.stdin, message)
+            return True
+        except (OSError, ValueError):
+            return False
+
+    def ping(self):
+        """Checks that the worker is running and answering; returns whether it is healthy."""
+        with self._ping_lock:
+            if self.process is None or self.process.poll() is not None:
+                return False
+            self._ping_id += 1
+            self._pong.clear()
+            return self._send(
+                {"type": "ping", "id": self._ping_id}
+            ) and self._pong.wait(self.health_timeout)
+
+    def listen(self):
+        """Starts emitting transcripts; the state survives restarts."""
+        self.listening = True
+        self._send({"type": "listen"})
+
+    def pause(self):
+        """Stops emitting transcripts, e.g. while the assistant is speaking."""
+        self.listening = False
+        self._send({"type": "pause"})
+
+    def _monitor(self):
+        while not self._stopped.wait(self.health_interval):
+            if self.ping():
+                continue
+            if self._stopped.is_set():
+                break
+            logging.error("ASR worker is not responding, restarting it")
+            self._kill()
+            for attempt in range(self.max_restarts):
+                if self._stopped.wait(min(2**attempt, 30)):
+                    return
+                if self._spawn():
+                    self.restarts += 1
+                    break
+            else:
+                logging.error(
+                    f"ASR worker failed to restart {self.max_restarts} times, giving up"
+                )
+                self.failed = True
+                return
+
+    def _kill(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+
+    def close(self):
+        """Shuts the worker down."""
+        self._stopped.set()
+        if self.process is None or self.process.poll() is not None:
+            return
+        self._send({"type": "shutdown"})
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self._kill()
+
+
+if __name__ == "__main__":
+    worker_main()
@@ -0,0 +1,292 @@
+"""
+Compares the old punctuation rule of pipi5.py with SentenceSegmenter on recorded token streams.
+
+Every stream is replayed with its recorded token times. For each strategy the benchmark reports the number
+of synthesis units, their mean length, the number of cuts inside a word ("3." + "14"), the time until the
+first unit is complete, and a model of Piper: one resident process synthesizes the units one after another,
+each costing a fixed overhead plus a time per character, and the audio is played as soon as it is ready.
+From this follow the time to first audio, the time the last unit is synthesized, the time Piper is busy (the
+per-unit overhead is what fewer, longer units save) and the time playback waits for audio.
+
+token_streams_sample.jsonl holds synthetic streams (Llama-like tokens, ~300 ms to the first token, ~30 ms per
+token); record real ones from a running Ollama server with --record.
+
+    python3 bench_segmenter.py
+    python3 bench_segmenter.py --record streams.jsonl --ollama-model tinydolphin
+    python3 bench_segmenter.py --streams streams.jsonl --piper-overhead-ms 120
+"""
+
+import json
+import time
+import argparse
+import statistics
+from segmenter import SentenceSegmenter, estimate_phonemes
+
+PROMPTS = [
+    "Say hello in one short sentence.",
+    "What is pi?",
+    "Give me three tips for sleeping better.",
+    "Who wrote the theory of relativity?",
+    "Explain in a few sentences why the sky is blue.",
+    "Tell me a short story about a robot learning to cook.",
+]
+
+
+def punctuation_units(stream):
+    """Yields (time, unit) with the rule pipi5.py used: flush when a token contains any punctuation."""
+    sentence = ""
+    for timestamp, token in stream:
+        sentence += token
+        if any(punctuation in token for punctuation in [".", "?", "!", ",", ";", ":"]):
+            yield timestamp, sentence
+            sentence = ""
+    if sentence:
+        yield stream[-1][0], sentence
+
+
+def segmenter_units(stream, **options):
+    """Yields (time, unit) from a SentenceSegmenter fed with the stream."""
+    segmenter = SentenceSegmenter(**options)
+    for timestamp, token in stream:
+        for unit in segmenter.feed(token):
+            yield timestamp, unit
+    for unit in segmenter.flush():
+        yield stream[-1][0], unit
+
+
+def mid_word_cuts(text, units):
+    """Counts the units that end inside a word of the original text."""
+    cuts = 0
+    position = 0
+    for unit in units[:-1]:
+        position = text.index(unit.strip(), position) + len(unit.strip())
+        if (
+            position < len(text)
+            and not text[position].isspace()
+            and not text[position - 1].isspace()
+        ):
+            cuts += 1
+    return cuts
+
+
+def simulate_piper(timed_units, overhead, per_character, speech_per_character):
+    """
+    Models serial synthesis followed by playback.
+
+    Returns:
+        tuple: The time to first audio, the time the last unit is synthesized, the time spent synthesizing
+        and the total time playback waits for the next unit.
+    """
+    busy = 0.0
+    synthesized = 0.0
+    playing_until = None
+    first_audio = None
+    stalls = 0.0
+    for timestamp, unit in timed_units:
+        text = unit.strip()
+        synthesis = overhead + per_character * len(text)
+        busy += synthesis
+        synthesized = max(synthesized, timestamp) + synthesis
+        if first_audio is None:
+            first_audio = synthesized
+            playing_until = synthesized
+        elif synthesized > playing_until:
+            stalls += synthesized - playing_until
+            playing_until = synthesized
+        playing_until += speech_per_character * len(text)
+    return first_audio, synthesized, busy, stalls
+
+
+def evaluate(name, units_of, streams, args):
+    rows = []
+    for record in streams:
+        stream = record["tokens"]
+        text = "".join(token for _, token in stream)
+        timed_units = [
+            (timestamp, unit) for timestamp, unit in units_of(stream) if unit.strip()
+        ]
+        units = [unit for _, unit in timed_units]
+        first_audio, synthesized, busy, stalls = simulate_piper(
+            timed_units,
+            args.piper_overhead_ms / 1000,
+            args.piper_ms_per_char / 1000,
+            args.speech_ms_per_char / 1000,
+        )
+        rows.append(
+            {
+                "strategy": name,
+                "prompt": record["prompt"],
+                "units": len(units),
+                "mean_length": statistics.mean(len(unit.strip()) for unit in units),
+                "mid_word_cuts": mid_word_cuts(text, units),
+                "first_unit_seconds": timed_units[0][0],
+                "first_audio_seconds": first_audio,
+                "synthesis_done_seconds": synthesized,
+                "synthesis_busy_seconds": busy,
+                "stall_seconds": stalls,
+            }
+        )
+    return rows
+
+
+def record_streams(path, model, url):
+    """Records the token streams of PROMPTS with their arrival times relative to the request."""
+    from ollama_client import OllamaClient
+
+    client = OllamaClient(url)
+    with open(path, "w") as streams_file:
+        for prompt in PROMPTS:
+            data = {
+                "model": model,
+                "prompt": prompt,
+                "keep_alive": -1,
+                "options": {"num_ctx": 2048},
+            }
+            start = time.perf_counter()
+            tokens = []
+            for chunk in client.generate(data):
+                if chunk.get("response"):
+                    tokens.append(
+                        [round(time.perf_counter() - start, 4), chunk["response"]]
+                    )
+            streams_file.write(
+                json.dumps(
+                    {
+                        "prompt": prompt,
+                        "model": model,
+                        "synthetic": False,
+                        "tokens": tokens,
+                    },
+                    ensure_ascii=False,
+                )
+                + "\n"
+            )
+            print(f"Recorded {len(tokens)} tokens for: {prompt}")
+    client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark of synthesis-unit segmentation on recorded token streams"
+    )
+    parser.add_argument(
+        "--streams",
+        default="token_streams_sample.jsonl",
+        help="JSON lines of recorded token streams",
+    )
+    parser.add_argument(
+        "--record",
+        metavar="FILE",
+        help="Record token streams from Ollama into FILE and exit",
+    )
+    parser.add_argument(
+        "--ollama-model",
+        default="tinydolphin",
+        help="Name of the Ollama model to record",
+    )
+    parser.add_argument(
+        "--ollama-url",
+        default="http://localhost:11434",
+        help="Address of the Ollama server",
+    )
+    parser.add_argument(
+        "--min-length",
+        type=int,
+        default=40,
+        help="Minimum unit length of the segmenter",
+    )
+    parser.add_argument(
+        "--max-length",
+        type=int,
+        default=250,
+        help="Maximum unit length of the segmenter",
+    )
+    parser.add_argument(
+        "--first-min-length",
+        type=int,
+        default=5,
+        help="Minimum length of the first unit; it doubles with every unit up to --min-length",
+    )
+    parser.add_argument(
+        "--phonemes",
+        action="store_true",
+        help="Measure units in estimated phonemes instead of characters",
+    )
+    parser.add_argument(
+        "--piper-overhead-ms",
+        type=float,
+        default=80.0,
+        help="Modelled fixed cost of one Piper utterance",
+    )
+    parser.add_argument(
+        "--piper-ms-per-char",
+        type=float,
+        default=4.0,
+        help="Modelled synthesis time per character",
+    )
+    parser.add_argument(
+        "--speech-ms-per-char",
+        type=float,
+        default=65.0,
+        help="Modelled playback time per character",
+    )
+    parser.add_argument("--json", help="Write all rows to this file")
+    args = parser.parse_args()
+
+    if args.record:
+        record_streams(args.record, args.ollama_model, args.ollama_url)
+        return
+
+    with open(args.streams) as streams_file:
+        streams = [json.loads(line) for line in streams_file if line.strip()]
+    # A response without tokens has no units to compare
+    streams = [record for record in streams if record["tokens"]]
+    if any(record.get("synthetic") for record in streams):
+        print(
+            f"Note: {args.streams} contains synthetic streams; record real ones with --record."
+        )
+
+    options = {
+        "min_length": args.min_length,
+        "max_length": args.max_length,
+        "first_min_length": args.first_min_length,
+        "length": estimate_phonemes if args.phonemes else len,
+    }
+    rows = evaluate("punctuation", punctuation_units, streams, args)
+    rows += evaluate(
+        "segmenter", lambda stream: segmenter_units(stream, **options), streams, args
+    )
+
+    columns = [
+        "units",
+        "mean_length",
+        "mid_word_cuts",
+        "first_unit_seconds",
+        "first_audio_seconds",
+        "synthesis_done_seconds",
+        "synthesis_busy_seconds",
+        "stall_seconds",
+    ]
+    print(
+        f"{'strategy':<12}{'units':>7}{'mean len':>10}{'mid-word':>10}{'first unit s':>14}{'first audio s':>15}{'synth done s':>14}{'busy s':>8}{'stalls s':>10}"
+    )
+    for name in ("punctuation", "segmenter"):
+        strategy_rows = [row for row in rows if row["strategy"] == name]
+        totals = {
+            column: statistics.mean(row[column] for row in strategy_rows)
+            for column in columns
+        }
+        totals["units"] = sum(row["units"] for row in strategy_rows)
+        totals["mid_word_cuts"] = sum(row["mid_word_cuts"] for row in strategy_rows)
+        print(
+            f"{name:<12}{totals['units']:>7}{totals['mean_length']:>10.1f}{totals['mid_word_cuts']:>10}{totals['first_unit_seconds']:>14.3f}"
+            f"{totals['first_audio_seconds']:>15.3f}{totals['synthesis_done_seconds']:>14.3f}{totals['synthesis_busy_seconds']:>8.3f}{totals['stall_seconds']:>10.3f}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as report_file:
+            json.dump(rows, report_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
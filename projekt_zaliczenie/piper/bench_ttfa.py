@@ -0,0 +1,199 @@
+"""
+Time-to-first-audio of buffered versus streamed Ollama responses.
+
+"buffered" reads the whole response before handing sentences to Piper, the way pipi3.py used to;
+"streamed" parses the NDJSON lines as they arrive and hands each sentence over immediately. Both split
+sentences with the flush rule of pipi3.py. For every prompt the benchmark reports the time until the
+first sentence reaches Piper and until Piper produces the first audio bytes.
+
+    python3 bench_ttfa.py --piper-model en_GB-cori-medium.onnx
+    python3 bench_ttfa.py --no-piper        # Only the time to the first sentence
+    python3 ../mock_ollama.py --port 11435 & python3 bench_ttfa.py --ollama-url http://localhost:11435   # Without an LLM
+"""
+
+import os
+import json
+import time
+import argparse
+import threading
+import subprocess
+import statistics
+from ollama_client import OllamaClient
+
+PROMPTS = [
+    "Say hello in one short sentence.",
+    "Give me three tips for sleeping better.",
+    "Explain in a few sentences why the sky is blue.",
+    "Tell me a short story about a robot learning to cook.",
+]
+
+
+def split_units(tokens):
+    """Yields synthesis units from a token stream with the punctuation rule of pipi3.py."""
+    sentence = ""
+    for token in tokens:
+        sentence += token
+        if any(punctuation in token for punctuation in [",", ".", "?", "!"]):
+            yield sentence.strip()
+            sentence = ""
+    if sentence.strip():
+        yield sentence.strip()
+
+
+class PiperSink:
+    """A resident Piper process whose first audio output after mark() is timed."""
+
+    def __init__(self, model_path):
+        self.process = subprocess.Popen(
+            ["./piper", "--model", model_path, "--output-raw"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            bufsize=0,
+        )
+        self.first_audio = None
+        self.last_read = time.perf_counter()
+        self._audio = threading.Event()
+        threading.Thread(target=self._read, daemon=True).start()
+
+    def _read(self):
+        while True:
+            chunk = os.read(self.process.stdout.fileno(), 65536)
+            if not chunk:
+                break
+            self.last_read = time.perf_counter()
+            if self.first_audio is None:
+                self.first_audio = self.last_read
+                self._audio.set()
+
+    def mark(self):
+        self.first_audio = None
+        self._audio.clear()
+
+    def send(self, text):
+        self.process.stdin.write((text + "\n").encode("utf-8"))
+        self.process.stdin.flush()
+
+    def wait_first_audio(self, timeout=30.0):
+        self._audio.wait(timeout)
+        return self.first_audio
+
+    def drain(self, quiet=0.5):
+        """Waits until Piper has stopped producing audio, so that the next run starts clean."""
+        while time.perf_counter() - self.last_read < quiet:
+            time.sleep(0.05)
+
+    def close(self):
+        self.process.stdin.close()
+        self.process.terminate()
+
+
+def run_prompt(mode, client, model, prompt, sink):
+    data = {
+        "model": model,
+        "prompt": prompt,
+        "keep_alive": -1,
+        "options": {"num_ctx": 2048},
+    }
+    if sink:
+        sink.mark()
+    start = time.perf_counter()
+    if mode == "buffered":
+        response = client.post("/api/generate", data)
+        response.raise_for_status()
+        tokens = (
+            json.loads(line).get("response", "")
+            for line in response.text.splitlines()
+            if line.strip()
+        )
+    else:
+        tokens = (chunk.get("response", "") for chunk in client.generate(data))
+
+    first_unit = None
+    for unit in split_units(tokens):
+        if first_unit is None:
+            first_unit = time.perf_counter()
+        if sink:
+            sink.send(unit)
+    total = time.perf_counter() - start
+
+    result = {
+        "mode": mode,
+        "prompt": prompt,
+        "first_unit_seconds": first_unit - start if first_unit else None,
+        "generation_seconds": total,
+        "first_audio_seconds": None,
+    }
+    if sink:
+        first_audio = sink.wait_first_audio()
+        result["first_audio_seconds"] = first_audio - start if first_audio else None
+        sink.drain()
+    return result
+
+
+def mean(results, key):
+    values = [result[key] for result in results if result[key] is not None]
+    return statistics.mean(values) if values else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time-to-first-audio of buffered and streamed Ollama responses"
+    )
+    parser.add_argument(
+        "--ollama-model", default="tinydolphin", help="Name of the Ollama model"
+    )
+    parser.add_argument(
+        "--ollama-url",
+        default="http://localhost:11434",
+        help="Address of the Ollama server",
+    )
+    parser.add_argument(
+        "--piper-model",
+        default="en_GB-cori-medium.onnx",
+        help="Path to the Piper model",
+    )
+    parser.add_argument(
+        "--no-piper",
+        action="store_true",
+        help="Do not synthesize, only time the first sentence",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Runs per prompt and mode"
+    )
+    parser.add_argument("--json", help="Write all runs to this file")
+    args = parser.parse_args()
+
+    client = OllamaClient(args.ollama_url)
+    sink = None if args.no_piper else PiperSink(args.piper_model)
+
+    # Load the model once, so that the first measured run does not pay for it
+    run_prompt("streamed", client, args.ollama_model, PROMPTS[0], sink)
+
+    results = []
+    try:
+        for _ in range(args.repeat):
+            for prompt in PROMPTS:
+                # Alternate the modes, so that both see the same server state
+                for mode in ("buffered", "streamed"):
+                    results.append(
+                        run_prompt(mode, client, args.ollama_model, prompt, sink)
+                    )
+    finally:
+        if sink:
+            sink.close()
+
+    print(f"{'mode':<10}{'first unit s':>14}{'first audio s':>15}{'generation s':>14}")
+    for mode in ("buffered", "streamed"):
+        runs = [result for result in results if result["mode"] == mode]
+        print(
+            f"{mode:<10}{mean(runs, 'first_unit_seconds'):>14.3f}{mean(runs, 'first_audio_seconds'):>15.3f}{mean(runs, 'generation_seconds'):>14.3f}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as report_file:
+            json.dump(results, report_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
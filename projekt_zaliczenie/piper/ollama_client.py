@@ -0,0 +1,245 @@
+"""
+Shared HTTP client for the Ollama API.
+
+One requests.Session is created at startup and reused for every turn, so a conversation keeps its TCP
+connection alive instead of connecting anew for each request. Every request records how long connecting
+took (zero when a kept-alive connection was reused), the time to the first generated token and the total
+time; the timings are logged and kept in `OllamaClient.timings`.
+
+`start_server` replaces a fixed wait for `ollama serve`: it reuses a server that is already listening,
+otherwise starts one and polls it with backoff until it answers, and can load the model ahead of the first
+request.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+import subprocess
+import requests
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlparse
+from urllib3.util.retry import Retry
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool
+
+DEFAULT_URL = "http://localhost:11434"
+
+_connect_time = threading.local()
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        # Requests connect lazily in the calling thread, so a thread-local tells the caller what it paid
+        _connect_time.seconds = (
+            getattr(_connect_time, "seconds", 0.0) + time.perf_counter() - start
+        )
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            **self.poolmanager.pool_classes_by_scheme,
+            "http": _TimedHTTPConnectionPool,
+        }
+
+
+class OllamaClient:
+    def __init__(
+        self,
+        base_url=DEFAULT_URL,
+        pool_maxsize=4,
+        connect_timeout=3.05,
+        read_timeout=300,
+    ):
+        """
+        Creates the session with a small keep-alive pool for the single Ollama host.
+
+        Args:
+            base_url (str, optional): The address of the Ollama server. Defaults to http://localhost:11434.
+            pool_maxsize (int, optional): The number of connections kept alive. Defaults to 4.
+            connect_timeout (float, optional): Seconds to wait for a connection. Defaults to 3.05.
+            read_timeout (float, optional): Seconds to wait for the next chunk of a response. Defaults to 300.
+        """
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        # Only failed connection attempts are retried; a POST that reached the server is never repeated
+        adapter = _TimedHTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_maxsize,
+            max_retries=Retry(
+                total=None, connect=2, read=0, status=0, other=0, backoff_factor=0.1
+            ),
+        )
+        self.session.mount("http://", adapter)
+        self.timings = []
+
+    def post(self, path, payload, stream=False):
+        """
+        Posts a JSON payload, e.g. post('/api/generate', data).
+
+        With stream=False the body is read completely and the request is timed here; with stream=True pass the
+        response to iter_chunks, which reads it incrementally and completes the timing.
+
+        Returns:
+            requests.Response: The response; its timing dict is attached as `response.timing`.
+        """
+        _connect_time.seconds = 0.0
+        start = time.perf_counter()
+        response = self.session.post(
+            self.base_url + path, json=payload, stream=stream, timeout=self.timeout
+        )
+        timing = {
+            "path": path,
+            "status": response.status_code,
+            "new_connection": _connect_time.seconds > 0,
+            "connect_seconds": _connect_time.seconds,
+            "headers_seconds": time.perf_counter() - start,
+            "first_token_seconds": None,
+            "total_seconds": None,
+            "chunks": 0,
+            "start": start,
+        }
+        response.timing = timing
+        if not stream:
+            self._finish(timing)
+        return response
+
+    def iter_chunks(self, response):
+        """
+        Parses a streamed NDJSON response line by line as it arrives and yields the JSON objects.
+
+        Lines that are not valid JSON are logged and skipped.
+        """
+        timing = response.timing
+        try:
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                try:
+                    chunk = json.loads(line)
+                except json.JSONDecodeError as e:
+                    logging.error(f"Error decoding JSON in streamed response: {e}")
+                    continue
+                timing["chunks"] += 1
+                if timing["first_token_seconds"] is None and chunk.get("response"):
+                    timing["first_token_seconds"] = (
+                        time.perf_counter() - timing["start"]
+                    )
+                yield chunk
+        finally:
+            response.close()
+            self._finish(timing)
+
+    def generate(self, payload):
+        """Streams /api/generate and yields its JSON chunks as they arrive."""
+        response = self.post("/api/generate", {**payload, "stream": True}, stream=True)
+        response.raise_for_status()
+        yield from self.iter_chunks(response)
+
+    def _finish(self, timing):
+        if timing["total_seconds"] is not None:
+            return
+        timing["total_seconds"] = time.perf_counter() - timing["start"]
+        self.timings.append(timing)
+        first_token = timing["first_token_seconds"]
+        logging.info(
+            f"Ollama {timing['path']}: "
+            + (
+                f"connect {timing['connect_seconds'] * 1000:.1f} ms"
+                if timing["new_connection"]
+                else "reused connection"
+            )
+            + (f", first token {first_token:.3f} s" if first_token is not None else "")
+            + f", total {timing['total_seconds']:.3f} s"
+        )
+
+    def is_ready(self):
+        """Returns whether the server answers; a refused connection is not retried."""
+        try:
+            return requests.get(self.base_url + "/api/version", timeout=(0.5, 2)).ok
+        except requests.RequestException:
+            return False
+
+    def wait_until_ready(
+        self, timeout=60.0, process=None, first_delay=0.05, max_delay=0.25
+    ):
+        """
+        Polls the server with exponential backoff until it answers.
+
+        Args:
+            timeout (float, optional): Seconds to wait at most. Defaults to 60.
+            process (subprocess.Popen, optional): The server process; waiting stops early if it exits.
+
+        Returns:
+            bool: True when the server answered in time.
+        """
+        deadline = time.perf_counter() + timeout
+        delay = first_delay
+        while True:
+            if self.is_ready():
+                return True
+            if process is not None and process.poll() is not None:
+                logging.error(
+                    f"Ollama server exited with code {process.returncode} before it became ready"
+                )
+                return False
+            if time.perf_counter() + delay > deadline:
+                return False
+            time.sleep(delay)
+            delay = min(delay * 2, max_delay)
+
+    def preload(self, model, keep_alive=-1):
+        """Loads the model without generating anything, so the first real request does not pay for it."""
+        response = self.post(
+            "/api/generate", {"model": model, "keep_alive": keep_alive}
+        )
+        response.raise_for_status()
+
+    def close(self):
+        self.session.close()
+
+
+def start_server(client, model=None, timeout=60.0):
+    """
+    Makes sure an Ollama server is listening at the client's address.
+
+    A running server is reused; otherwise `ollama serve` is started and polled until it answers. With a model
+    given, the model is loaded into memory with keep_alive before returning.
+
+    Returns:
+        tuple: The started process, or None if a running server was reused, and whether the server is ready.
+    """
+    process = None
+    if client.is_ready():
+        logging.info(f"Reusing the Ollama server at {client.base_url}")
+    else:
+        start = time.perf_counter()
+        # The server listens where the client expects it
+        env = {**os.environ, "OLLAMA_HOST": urlparse(client.base_url).netloc}
+        process = subprocess.Popen(
+            ["ollama", "serve"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            env=env,
+        )
+        if not client.wait_until_ready(timeout, process):
+            process.terminate()
+            return None, False
+        logging.info(f"Ollama server ready after {time.perf_counter() - start:.2f} s")
+    if model:
+        try:
+            client.preload(model)
+        except requests.RequestException as e:
+            # The model is then loaded by the first request instead
+            logging.error(f"Failed to preload {model}: {e}")
+    return process, True
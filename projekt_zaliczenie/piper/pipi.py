@@ -1,8 +1,7 @@
 import subprocess
-import requests
-import time
 import json
 import threading
+from ollama_client import OllamaClient, start_server
 
 # ANSI escape codes for colors
 RED = "\033[31m"
@@ -11,6 +10,9 @@ BLUE = "\033[34m"
 YELLOW = "\033[33m"
 RESET = "\033[0m"
 
+# One keep-alive session for the whole chat
+ollama_client = OllamaClient()
+
 def start_piper():
     """Starts the piper service and keeps it running for audio processing."""
     log_file = open('piper_logs.txt', 'a')  # Append mode for logging
@@ -24,15 +26,13 @@ def play_audio(pipe):
     aplay_process = subprocess.Popen(['aplay', '-r', '22050', '-f', 'S16_LE', '-t', 'raw'], stdin=pipe)
     aplay_process.wait()
 
-def start_ollama_server():
-    """Starts the ollama server and waits for it to become ready."""
+def start_ollama_server(model=None):
+    """Reuses a running ollama server or starts one, and waits until it answers."""
     try:
-        server_process = subprocess.Popen(['ollama', 'serve'], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        time.sleep(10)  # Give some time for the server to start
-        return server_process
-    except Exception as e:
+        return start_server(ollama_client, model)
+    except OSError as e:  # E.g. ollama is not installed
         print(f"{RED}Failed to start Ollama server: {e}{RESET}")
-        return None
+        return None, False
 
 def handle_streamed_json(response_text):
     """Processes streamed JSON data from Ollama."""
@@ -52,7 +52,6 @@ def handle_streamed_json(response_text):
 def get_response_from_ollama(input_text):
     """Sends input to Ollama and handles the response."""
     print(f"{YELLOW}Processing your input...{RESET}")
-    url = 'http://localhost:11434/api/generate'
     data = {
         "model": "tinydolphin",
         "prompt": input_text,
@@ -60,7 +59,7 @@ def get_response_from_ollama(input_text):
             "num_ctx": 2048
         }
     }
-    response = requests.post(url, json=data)
+    response = ollama_client.post('/api/generate', data)
     if response.status_code == 200:
         return handle_streamed_json(response.text)
     else:
@@ -70,9 +69,9 @@ def get_response_from_ollama(input_text):
 def main():
     print(f"{BLUE}Starting services...{RESET}")
     piper_process = start_piper()
-    ollama_process = start_ollama_server()
+    ollama_process, ollama_ready = start_ollama_server('tinydolphin')
 
-    if not ollama_process or not piper_process:
+    if not ollama_ready or not piper_process:
         print(f"{RED}Failed to start services. Exiting.{RESET}")
         return
 
@@ -1,11 +1,8 @@
 import subprocess
-import requests
-import time
-import json
 import threading
+from ollama_client import OllamaClient, start_server
 import argparse
 import logging
-import queue
 from queue import Queue
 
 # ANSI escape codes for colors
@@ -18,6 +15,9 @@ RESET = "\033[0m"
 # Set up logging
 logging.basicConfig(filename='app.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# One keep-alive session for the whole chat
+ollama_client = OllamaClient()
+
 # Function to start Piper
 def start_piper(model_path):
     """Starts the piper service and keeps it running for audio processing."""
@@ -38,66 +38,61 @@ def play_audio(pipe):
         logging.error(f"aplay Error: {line.decode().strip()}")
 
 # Function to start Ollama server
-def start_ollama_server():
-    """Starts the ollama server and waits for it to become ready."""
+def start_ollama_server(model=None):
+    """Reuses a running ollama server or starts one, and waits until it answers."""
     try:
-        server_process = subprocess.Popen(['ollama', 'serve'], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        time.sleep(10)  # Wait for the server to start
-        return server_process
-    except Exception as e:
+        return start_server(ollama_client, model)
+    except OSError as e:  # E.g. ollama is not installed
         logging.error(f"Failed to start Ollama server: {e}")
-        return None
+        return None, False
 
 # Function to handle streamed JSON response from Ollama
-def handle_streamed_json(response_text, piper_process, response_queue):
-    """Processes streamed JSON data from Ollama and sends it to Piper."""
+def handle_streamed_json(response, piper_process, response_queue):
+    """Parses the streamed JSON lines from Ollama as they arrive and queues sentences for Piper."""
     sentence = ""
-    for line in response_text.strip().split("\n"):
-        if line.strip():
-            try:
-                json_obj = json.loads(line)
-                partial_response = json_obj.get("response", "")
-                if partial_response:
-                    sentence += partial_response
-                    if any(punctuation in partial_response for punctuation in [',', '.', '?', '!']):
-                        response_queue.put(sentence.strip())
-                        sentence = ""
-            except json.JSONDecodeError as e:
-                logging.error(f"Error decoding JSON in streamed response: {e}")
-    if sentence:
-        response_queue.put(sentence.strip())
+    try:
+        for json_obj in ollama_client.iter_chunks(response):
+            partial_response = json_obj.get("response", "")
+            if partial_response:
+                sentence += partial_response
+                if any(punctuation in partial_response for punctuation in [',', '.', '?', '!']):
+                    response_queue.put(sentence.strip())
+                    sentence = ""
+        if sentence:
+            response_queue.put(sentence.strip())
+    except Exception as e:
+        logging.error(f"Error handling streamed JSON: {e}")
+    finally:
+        response_queue.put(None)  # Marks the end of the response
 
 # Function to get response from Ollama
 def get_response_from_ollama(input_text, model_name, piper_process):
-    """Sends input to Ollama and handles the response."""
+    """Sends input to Ollama and feeds Piper sentence by sentence while tokens are still arriving."""
     print(f"{YELLOW}Processing your input...{RESET}")
-    url = 'http://localhost:11434/api/generate'
     data = {
         "model": model_name,
         "prompt": input_text,
+        "stream": True,
 	"keep_alive": -1,
         "options": {
             "num_ctx": 2048,
         }
     }
-    response = requests.post(url, json=data)
+    response = ollama_client.post('/api/generate', data, stream=True)
 
     if response.status_code == 200:
         response_queue = Queue()
-        threading.Thread(target=handle_streamed_json, args=(response.text, piper_process, response_queue), daemon=True).start()
+        threading.Thread(target=handle_streamed_json, args=(response, piper_process, response_queue), daemon=True).start()
 
         print(f"{YELLOW}Ollama: ", end="", flush=True)
         while True:
-            try:
-                partial_response = response_queue.get(timeout=0.1)
-                print(partial_response, end=" ", flush=True)
-                piper_process.stdin.write((partial_response + '\n').encode('utf-8'))
-                piper_process.stdin.flush()
-            except queue.Empty:
-                if response_queue.empty():
-                    break
-                else:
-                    continue
+            # Wait for the end marker rather than an empty queue, the next sentence may still be generating
+            partial_response = response_queue.get()
+            if partial_response is None:
+                break
+            print(partial_response, end=" ", flush=True)
+            piper_process.stdin.write((partial_response + '\n').encode('utf-8'))
+            piper_process.stdin.flush()
         print(f"{RESET}")
     else:
         print(f"{RED}Error: HTTP {response.status_code} - {response.text}{RESET}")
@@ -109,13 +104,14 @@ def main():
     parser = argparse.ArgumentParser(description='Ollama Conversational Interface')
     parser.add_argument('--piper-model', default='en_GB-cori-medium.onnx', help='Path to the Piper model')
     parser.add_argument('--ollama-model', default='tinydolphin', help='Name of the Ollama model')
+    parser.add_argument('--no-preload', action='store_true', help='Do not load the Ollama model before the first request')
     args = parser.parse_args()
 
     print(f"{BLUE}Starting services...{RESET}")
     piper_process = start_piper(args.piper_model)
-    ollama_process = start_ollama_server()
+    ollama_process, ollama_ready = start_ollama_server(None if args.no_preload else args.ollama_model)
 
-    if not ollama_process or not piper_process:
+    if not ollama_ready or not piper_process:
         print(f"{RED}Failed to start services. Exiting.{RESET}")
         return
 
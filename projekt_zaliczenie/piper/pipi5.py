@@ -1,8 +1,8 @@
 import subprocess
 import requests
-import time
-import json
 import threading
+from ollama_client import OllamaClient, start_server
+from segmenter import SentenceSegmenter
 import argparse
 import logging
 import queue
@@ -18,6 +18,9 @@ RESET = "\033[0m"
 # Set up logging
 logging.basicConfig(filename='app.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# One keep-alive session for the whole chat
+ollama_client = OllamaClient()
+
 # Function to start Piper
 def start_piper(model_path):
     """Starts the piper service and keeps it running for audio processing."""
@@ -38,38 +41,40 @@ def play_audio(pipe):
         logging.error(f"aplay Error: {line.decode().strip()}")
 
 # Function to start Ollama server
-def start_ollama_server():
-    """Starts the ollama server and waits for it to become ready."""
+def start_ollama_server(model=None):
+    """Reuses a running ollama server or starts one, and waits until it answers."""
     try:
-        server_process = subprocess.Popen(['ollama', 'serve'], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        time.sleep(10)  # Wait for the server to start
-        return server_process
-    except Exception as e:
+        return start_server(ollama_client, model)
+    except OSError as e:  # E.g. ollama is not installed
         logging.error(f"Failed to start Ollama server: {e}")
-        return None
+        return None, False
+
+# Function to send one synthesis unit to Piper
+def speak(unit, piper_process):
+    """Writes one synthesis unit to Piper and prints it."""
+    piper_process.stdin.write((unit + '\n').encode('utf-8'))
+    piper_process.stdin.flush()
+    print(unit, end=" ", flush=True)
 
 # Function to handle streamed JSON response from Ollama
 def handle_streamed_json(response, piper_process):
-    """Processes streamed JSON data from Ollama and sends it to Piper."""
+    """Processes streamed JSON data from Ollama and sends it to Piper in whole sentences."""
+    segmenter = SentenceSegmenter()
     try:
-        sentence = ""
-        for chunk in response.iter_lines(decode_unicode=True):
-            if chunk:
-                try:
-                    json_data = json.loads(chunk)
-                    partial_response = json_data.get("response", "")
-                    done = json_data.get("done", False)
-                    if partial_response:
-                        sentence += partial_response
-                        if any(punctuation in partial_response for punctuation in ['.', '?', '!', ',', ';', ':']):
-                            piper_process.stdin.write((sentence + '\n').encode('utf-8'))
-                            piper_process.stdin.flush()
-                            print(sentence, end="", flush=True)
-                            sentence = ""
-                    if done:
-                        print()  # Print a newline after the response is complete
-                except json.JSONDecodeError as e:
-                    logging.error(f"Error decoding JSON in streamed response: {e}")
+        for json_data in ollama_client.iter_chunks(response):
+            if json_data:
+                partial_response = json_data.get("response", "")
+                done = json_data.get("done", False)
+                if partial_response:
+                    for unit in segmenter.feed(partial_response):
+                        speak(unit, piper_process)
+                if done:
+                    for unit in segmenter.flush():
+                        speak(unit, piper_process)
+                    print()  # Print a newline after the response is complete
+        # The stream may end without a done chunk
+        for unit in segmenter.flush():
+            speak(unit, piper_process)
     except Exception as e:
         logging.error(f"Error handling streamed JSON: {e}")
 
@@ -77,7 +82,6 @@ def handle_streamed_json(response, piper_process):
 def get_response_from_ollama(input_text, model_name, piper_process):
     """Sends input to Ollama and handles the response."""
     print(f"{YELLOW}Processing your input...{RESET}")
-    url = 'http://localhost:11434/api/generate'
     data = {
         "model": model_name,
         "prompt": input_text,
@@ -87,7 +91,7 @@ def get_response_from_ollama(input_text, model_name, piper_process):
         }
     }
     try:
-        response = requests.post(url, json=data, stream=True)
+        response = ollama_client.post('/api/generate', data, stream=True)
         response.raise_for_status()
 
         print(f"{YELLOW}Ollama: {RESET}", end="", flush=True)
@@ -103,13 +107,14 @@ def main():
     parser = argparse.ArgumentParser(description='Ollama Conversational Interface')
     parser.add_argument('--piper-model', default='en_GB-cori-medium.onnx', help='Path to the Piper model')
     parser.add_argument('--ollama-model', default='tinydolphin', help='Name of the Ollama model')
+    parser.add_argument('--no-preload', action='store_true', help='Do not load the Ollama model before the first request')
     args = parser.parse_args()
 
     print(f"{BLUE}Starting services...{RESET}")
     piper_process = start_piper(args.piper_model)
-    ollama_process = start_ollama_server()
+    ollama_process, ollama_ready = start_ollama_server(None if args.no_preload else args.ollama_model)
 
-    if not ollama_process or not piper_process:
+    if not ollama_ready or not piper_process:
         print(f"{RED}Failed to start services. Exiting.{RESET}")
         return
 
@@ -1,13 +1,13 @@
 import subprocess  # Import modułu subprocess do uruchamiania poleceń zewnętrznych
-import requests  # Import modułu requests do wysyłania żądań HTTP
-import time  # Import modułu time do dodawania opóźnień
-import json  # Import modułu json do obsługi danych JSON
+import requests  # Import modułu requests do obsługi wyjątków HTTP
 import threading  # Import modułu threading do równoległego wykonywania zadań
 import argparse  # Import modułu argparse do parsowania argumentów wiersza poleceń
 import logging  # Import modułu logging do rejestrowania komunikatów
+import queue  # Import modułu queue do obsługi wyjątku Empty
 from queue import Queue  # Import klasy Queue z modułu queue do komunikacji międzywątkowej
-import os  # Import modułu os do obsługi systemu plików
 import signal  # Import modułu signal do obsługi sygnałów
+from ollama_client import OllamaClient, start_server  # Import współdzielonego klienta HTTP dla Ollama
+from asr_worker import ASRWorker, docker_command, standin_command  # Import stałego procesu rozpoznawania mowy
 
 # Kody ANSI do kolorowania tekstu
 RED = "\033[31m"  # Definiuje kod ANSI dla koloru czerwonego
@@ -19,6 +19,9 @@ RESET = "\033[0m"  # Definiuje kod ANSI do resetowania koloru
 # Konfiguracja rejestrowania
 logging.basicConfig(level=logging.INFO)
 
+# Jedna sesja HTTP z utrzymywanym połączeniem dla całej rozmowy
+ollama_client = OllamaClient()
+
 # Globalne zmienne
 running = True
 transcript = []
@@ -29,7 +32,7 @@ def signal_handler(sig, frame):
     print(f"\nSignal {sig} received, exiting.")
     running = False
 
-def handle_user_input(user_input, transcript, process, transcript_queue):
+def handle_user_input(user_input, transcript, worker, transcript_queue):
     global running
     user_input = user_input.lower()
     if user_input == 'q':
@@ -39,28 +42,14 @@ def handle_user_input(user_input, transcript, process, transcript_queue):
         transcript.clear()
         print(f"\033c", end="")
     elif user_input == 'w':
+        # Wstrzymuje rozpoznawanie, aby asystent nie transkrybował własnej odpowiedzi
+        worker.pause()
         transcript_queue.put(''.join(transcript))
         transcript.clear()
         print(f"\033c", end="")
-        send_control_command('pause', pipe_name)
-        process.wait()
-        send_control_command('resume', pipe_name)
     else:
         print(f"{RED}Invalid input. Please try again.{RESET}")
 
-def send_control_command(command, pipe_name):
-    with open(pipe_name, 'w') as pipe:
-        pipe.write(command + '\n')
-    logging.info(f"Command sent: {command}")
-    time.sleep(0.1)
-
-def remove_pipe(pipe_name):
-    try:
-        os.remove(pipe_name)
-        logging.info("Named pipe removed")
-    except OSError as e:
-        logging.error(f"Error removing named pipe: {e}")
-
 # Funkcja do uruchamiania Pipera
 def start_piper(model_path):
     """Uruchamia usługę Piper i utrzymuje ją w stanie aktywnym do przetwarzania dźwięku."""
@@ -80,38 +69,32 @@ def play_audio(pipe):
         logging.error(f"aplay Error: {line.decode().strip()}")  # Rejestruje wszelkie błędy z aplay
 
 # Funkcja do uruchamiania serwera Ollama
-def start_ollama_server():
-    """Uruchamia serwer Ollama i czeka na jego gotowość."""
+def start_ollama_server(model=None):
+    """Używa działającego serwera Ollama lub go uruchamia i czeka, aż odpowie."""
     try:
-        server_process = subprocess.Popen(['ollama', 'serve'], stdout=subprocess.PIPE, stderr=subprocess.PIPE)  # Uruchamia proces serwera Ollama z potokami wyjściowymi i błędów
-        time.sleep(10)  # Czeka 10 sekund, aby umożliwić uruchomienie serwera
-        return server_process  # Zwraca obiekt procesu serwera
-    except Exception as e:  # Przechwytuje wszelkie wyjątki, które wystąpią
+        return start_server(ollama_client, model)  # Odpytuje serwer z rosnącym odstępem zamiast czekać stałe 10 sekund
+    except OSError as e:  # Np. brak programu ollama; błędy w kodzie nie są zgłaszane jako awaria serwera
         logging.error(f"Failed to start Ollama server: {e}")  # Rejestruje komunikat o błędzie
-        return None  # Zwraca None, aby wskazać niepowodzenie
+        return None, False  # Zwraca brak procesu i niepowodzenie
 
 # Funkcja do obsługi strumieniowej odpowiedzi JSON z Ollama
 def handle_streamed_json(response, piper_process):
     """Przetwarza strumieniowe dane JSON z Ollama i wysyła je do Pipera."""
     try:
         sentence = ""  # Inicjalizuje pusty ciąg zdania
-        for chunk in response.iter_lines(decode_unicode=True):  # Iteruje po liniach w odpowiedzi strumieniowej
-            if chunk:  # Jeśli fragment nie jest pusty
-                try:
-                    json_data = json.loads(chunk)  # Analizuje dane JSON z fragmentu
-                    partial_response = json_data.get("response", "")  # Pobiera częściową odpowiedź z danych JSON
-                    done = json_data.get("done", False)  # Pobiera flagę zakończenia z danych JSON
-                    if partial_response:  # Jeśli istnieje częściowa odpowiedź
-                        sentence += partial_response  # Dołącza częściową odpowiedź do zdania
-                        if any(punctuation in partial_response for punctuation in ['.', '?', '!', ',', ';', ':']):  # Jeśli częściowa odpowiedź zawiera jakikolwiek znak interpunkcyjny
-                            piper_process.stdin.write((sentence + '\n').encode('utf-8'))  # Zapisuje zdanie do potoku wejściowego Pipera
-                            piper_process.stdin.flush()  # Opróżnia potok wejściowy, aby upewnić się, że dane zostały wysłane
-                            print(sentence, end="", flush=True)  # Wyświetla zdanie bez nowej linii
-                            sentence = ""  # Resetuje ciąg zdania
-                    if done:  # Jeśli odpowiedź jest zakończona
-                        print()  # Wyświetla nową linię po zakończeniu odpowiedzi
-                except json.JSONDecodeError as e:  # Przechwytuje błędy dekodowania JSON
-                    logging.error(f"Error decoding JSON in streamed response: {e}")  # Rejestruje komunikat o błędzie
+        for json_data in ollama_client.iter_chunks(response):  # Iteruje po obiektach JSON w odpowiedzi strumieniowej
+            if json_data:  # Jeśli fragment nie jest pusty
+                partial_response = json_data.get("response", "")  # Pobiera częściową odpowiedź z danych JSON
+                done = json_data.get("done", False)  # Pobiera flagę zakończenia z danych JSON
+                if partial_response:  # Jeśli istnieje częściowa odpowiedź
+                    sentence += partial_response  # Dołącza częściową odpowiedź do zdania
+                    if any(punctuation in partial_response for punctuation in ['.', '?', '!', ',', ';', ':']):  # Jeśli częściowa odpowiedź zawiera jakikolwiek znak interpunkcyjny
+                        piper_process.stdin.write((sentence + '\n').encode('utf-8'))  # Zapisuje zdanie do potoku wejściowego Pipera
+                        piper_process.stdin.flush()  # Opróżnia potok wejściowy, aby upewnić się, że dane zostały wysłane
+                        print(sentence, end="", flush=True)  # Wyświetla zdanie bez nowej linii
+                        sentence = ""  # Resetuje ciąg zdania
+                if done:  # Jeśli odpowiedź jest zakończona
+                    print()  # Wyświetla nową linię po zakończeniu odpowiedzi
     except Exception as e:  # Przechwytuje wszelkie inne wyjątki, które wystąpią
         logging.error(f"Error handling streamed JSON: {e}")  # Rejestruje komunikat o błędzie
 
@@ -119,7 +102,6 @@ def handle_streamed_json(response, piper_process):
 def get_response_from_ollama(input_text, model_name, piper_process):
     """Wysyła dane wejściowe do Ollama i obsługuje odpowiedź."""
     print(f"{YELLOW}Processing your input...{RESET}")  # Wyświetla komunikat wskazujący, że dane wejściowe są przetwarzane
-    url = 'http://localhost:11434/api/generate'  # Definiuje adres URL dla punktu końcowego API Ollama
     data = {
         "model": model_name,  # Określa nazwę modelu
         "prompt": input_text,  # Określa tekst wejściowy jako prompt
@@ -129,7 +111,7 @@ def get_response_from_ollama(input_text, model_name, piper_process):
         }
     }
     try:
-        response = requests.post(url, json=data, stream=True)  # Wysyła żądanie POST do API Ollama z danymi wejściowymi i włącza strumieniowanie
+        response = ollama_client.post('/api/generate', data, stream=True)  # Wysyła żądanie POST przez współdzieloną sesję i włącza strumieniowanie
         response.raise_for_status()  # Zgłasza wyjątek, jeśli kod statusu odpowiedzi wskazuje na błąd
 
         print(f"{YELLOW}Ollama: {RESET}", end="", flush=True)  # Wyświetla komunikat wskazujący, że Ollama odpowiada
@@ -144,97 +126,72 @@ def get_response_from_ollama(input_text, model_name, piper_process):
         return 'Unexpected error occurred.'  # Zwraca komunikat o błędzie
 
 # Funkcja do uruchamiania rozpoznawania mowy
-def start_voice_recognition(args, piper_process, transcript_queue):
-    global running, transcript
-
-    pipe_name = 'voice_recognition_pipe'
-    if not os.path.exists(pipe_name):
-        try:
-            os.mkfifo(pipe_name)
-            logging.info("Named pipe created")
-        except OSError as e:
-            logging.error(f"Error creating named pipe: {e}")
-            return
-
-    signal.signal(signal.SIGINT, signal_handler)
-    signal.signal(signal.SIGTERM, signal_handler)
-
-    def transcribe_audio():
-        global running, transcript
+def start_voice_recognition(args, transcript_queue):
+    """Uruchamia stały proces ASR z modelem w pamięci oraz wątek obsługi klawiatury."""
+    def on_transcript(text, final):
+        if final:
+            transcript.append(text + " ")
+            print(f"\rYou: {''.join(transcript)}", end="", flush=True)
+        else:
+            print(f"\rYou: {''.join(transcript)}{text}", end="", flush=True)
+
+    if args.local_asr:
+        command = standin_command()
+    else:
+        command = docker_command(args.container, '--mic', '11')
+    worker = ASRWorker(command, on_transcript, stderr=open('asr_logs.txt', 'a'))  # Model ładowany jest raz, a nie przy każdej wypowiedzi
+    worker.start()
+    worker.listen()
+    logging.info("Voice recognition worker started")
 
+    def read_user_input():
         print(f"\n{GREEN}Press 'w' to send the transcript, 'e' to clear the screen and input buffer, or 'q' to quit: {RESET}")
-
         while running:
-            command = [
-                'docker', 'exec', '-i', 'charming_benz',
-                'python3', '-u', 'examples/asr.py',
-                '--mic', '11',
-                '--pipe', pipe_name,
-            ]
-            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            logging.info("Voice recognition process started")
-
-            try:
-                process.wait(timeout=5)
-                break  # Dodanie `break` do zakończenia pętli po zakończeniu procesu
-            except subprocess.TimeoutExpired:
-                logging.error("Voice recognition process timed out")
-                process.terminate()
-                continue
-
-            try:
-                for line in iter(process.stdout.readline, b''):
-                    partial_transcript = line.decode('utf-8').strip()
-                    if partial_transcript:
-                        transcript.append(partial_transcript + " ")
-                        print(f"\rYou: {''.join(transcript)}", end="", flush=True)
-
-                for line in iter(process.stderr.readline, b''):
-                    logging.error(f"Error: {line.decode('utf-8').strip()}")
+            user_input = input()
+            handle_user_input(user_input, transcript, worker, transcript_queue)
 
-                if transcript:
-                    user_input = input()
-                    handle_user_input(user_input, transcript, process, transcript_queue)
-
-            except Exception as e:
-                logging.error(f"Unexpected error: {e}")
-                time.sleep(5)
-
-    remove_pipe(pipe_name)
-
-    transcription_thread = threading.Thread(target=transcribe_audio, daemon=True)
-    transcription_thread.start()
-    transcription_thread.join()
+    threading.Thread(target=read_user_input, daemon=True).start()
+    return worker
 
 # Funkcja główna
 def main():
     parser = argparse.ArgumentParser(description='Ollama Conversational Interface')  # Tworzy parser argumentów z opisem
     parser.add_argument('--piper-model', default='en_GB-cori-medium.onnx', help='Path to the Piper model')  # Dodaje argument dla ścieżki modelu Piper
     parser.add_argument('--ollama-model', default='tinydolphin', help='Name of the Ollama model')  # Dodaje argument dla nazwy modelu Ollama
+    parser.add_argument('--no-preload', action='store_true', help='Do not load the Ollama model before the first request')  # Dodaje argument wyłączający wstępne wczytanie modelu
+    parser.add_argument('--container', default='charming_benz', help='Name of the Docker container running the ASR worker')  # Dodaje argument dla nazwy kontenera
+    parser.add_argument('--local-asr', action='store_true', help='Use the local stand-in ASR worker instead of Docker')  # Dodaje argument dla lokalnego zastępczego procesu ASR
     args = parser.parse_args()  # Parsuje argumenty wiersza poleceń
 
+    signal.signal(signal.SIGINT, signal_handler)  # Rejestruje obsługę sygnałów w wątku głównym
+    signal.signal(signal.SIGTERM, signal_handler)
+
     print(f"{BLUE}Starting other services...{RESET}")  # Wyświetla komunikat wskazujący, że inne usługi są uruchamiane
     piper_process = start_piper(args.piper_model)  # Uruchamia proces Pipera z określonym modelem
-    ollama_process = start_ollama_server()  # Uruchamia proces serwera Ollama
-
-    transcript_queue = Queue()  # Tworzy kolejkę do przechowywania transkrypcji
+    ollama_process, ollama_ready = start_ollama_server(None if args.no_preload else args.ollama_model)  # Używa działającego serwera Ollama lub go uruchamia i wczytuje model
 
-    # Uruchamia rozpoznawanie mowy w oddzielnym wątku
-    start_voice_recognition(args, piper_process, transcript_queue)
-
-    if not ollama_process or not piper_process:  # Jeśli serwer Ollama lub proces Pipera nie zostały uruchomione
+    if not ollama_ready or not piper_process:  # Jeśli serwer Ollama lub proces Pipera nie zostały uruchomione
         print(f"{RED}Failed to start services. Exiting.{RESET}")  # Wyświetla komunikat o błędzie wskazujący na niepowodzenie
         return  # Kończy działanie programu
 
+    transcript_queue = Queue()  # Tworzy kolejkę do przechowywania transkrypcji
+
+    # Uruchamia rozpoznawanie mowy w oddzielnym procesie
+    worker = start_voice_recognition(args, transcript_queue)
+
     try:
-        while running:
-            transcript = transcript_queue.get()
+        while running and not worker.failed:
+            try:
+                transcript = transcript_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
             if transcript:
                 print(f"\nTranscribed: {transcript}")
                 get_response_from_ollama(transcript, args.ollama_model, piper_process)
-                time.sleep(1)  # Dodaje opóźnienie 1 sekundy, aby zmniejszyć obciążenie systemu
+            worker.listen()  # Wznawia rozpoznawanie po odpowiedzi
     finally:
         print(f"{BLUE}Stopping services...{RESET}")  # Wyświetla komunikat wskazujący, że usługi są zatrzymywane
+        worker.close()  # Zamyka proces ASR
         if ollama_process:  # Jeśli istnieje proces serw
             ollama_process.terminate()  # Kończy proces serwera Ollama
             ollama_process.wait()  # Czeka na zakończenie procesu
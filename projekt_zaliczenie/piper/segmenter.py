@@ -0,0 +1,190 @@
+"""
+Incremental segmentation of a streamed LLM response into synthesis units for Piper.
+
+Every unit written to Piper costs a fixed per-utterance overhead, and Piper cannot start speaking before the
+first unit is complete. The segmenter therefore cuts the token stream only at real sentence or clause
+boundaries: a period in "3.14", "e.g." or "example.com" is not one, since a boundary must be followed by
+whitespace and must not end an abbreviation, an initial or a list number. A unit ends at the first sentence
+or clause boundary once it has reached its minimum length, and long ones are split before `max_length`.
+The minimum starts small, so that audio starts early, and doubles with every unit up to `min_length`, so
+each unit is synthesized while the previous one plays and later units share the per-call overhead.
+"""
+
+import re
+
+HARD_PUNCTUATION = ".!?…"
+SOFT_PUNCTUATION = ",;:"
+CLOSING = "\"')]}»”’"
+
+ABBREVIATIONS = {
+    "mr",
+    "mrs",
+    "ms",
+    "dr",
+    "prof",
+    "sr",
+    "jr",
+    "st",
+    "mt",
+    "vs",
+    "etc",
+    "e.g",
+    "i.e",
+    "cf",
+    "approx",
+    "nos",
+    "fig",
+    "vol",
+    "inc",
+    "ltd",
+    "co",
+    "corp",
+    "dept",
+    "est",
+    "min",
+    "max",
+    "jan",
+    "feb",
+    "mar",
+    "apr",
+    "jun",
+    "jul",
+    "aug",
+    "sep",
+    "sept",
+    "oct",
+    "nov",
+    "dec",
+    "mon",
+    "tue",
+    "wed",
+    "thu",
+    "fri",
+    "sat",
+    "sun",
+    "a.m",
+    "p.m",
+}
+_DOTTED_ACRONYM = re.compile(r"^(?:[A-Za-z]\.)+[A-Za-z]$")
+
+
+def estimate_phonemes(text):
+    """Roughly estimates the number of phonemes; digits count more as they are spoken as whole words."""
+    return sum(
+        3 if character.isdigit() else 1 for character in text if character.isalnum()
+    )
+
+
+class SentenceSegmenter:
+    def __init__(self, min_length=40, max_length=250, first_min_length=5, length=len):
+        """
+        Creates a segmenter for one response.
+
+        Args:
+            min_length (int, optional): The largest minimum length of a unit; shorter sentences and clauses
+            are merged with the following ones. Defaults to 40.
+            max_length (int, optional): Longer sentences are split at a clause or a space. Defaults to 250.
+            first_min_length (int, optional): The minimum length of the first unit; every later unit must be
+            at least twice as long as the previous one, up to min_length. Defaults to 5.
+            length (callable, optional): Measures a unit, e.g. len for characters or estimate_phonemes.
+            Defaults to len.
+        """
+        self.min_length = min_length
+        self.max_length = max_length
+        self.first_min_length = first_min_length
+        self.length = length
+        self.buffer = ""
+        self.next_min_length = first_min_length
+
+    def feed(self, text):
+        """Adds streamed text and returns the units that are complete."""
+        self.buffer += text
+        return self._units(final=False)
+
+    def flush(self):
+        """Returns the remaining units at the end of the response."""
+        return self._units(final=True)
+
+    def _units(self, final):
+        units = []
+        while True:
+            unit = self._next_unit(final)
+            if unit is None:
+                return units
+            units.append(unit)
+
+    def _next_unit(self, final):
+        last_break = None
+        for end in self._boundaries(final):
+            size = self.length(self.buffer[:end].strip())
+            if size > self.max_length:
+                break
+            last_break = end
+            if size >= self.next_min_length:
+                return self._cut(end)
+
+        if self.length(self.buffer.strip()) > self.max_length:
+            return self._cut(last_break or self._last_space())
+        if final and self.buffer.strip():
+            return self._cut(len(self.buffer))
+        return None
+
+    def _boundaries(self, final):
+        """Yields the end of every boundary in the buffer whose following character has arrived."""
+        text = self.buffer
+        i = 0
+        while i < len(text):
+            character = text[i]
+            if character == "\n":
+                yield i + 1
+                i += 1
+                continue
+            if character not in HARD_PUNCTUATION and character not in SOFT_PUNCTUATION:
+                i += 1
+                continue
+
+            end = i + 1
+            while end < len(text) and (
+                text[end] in HARD_PUNCTUATION or text[end] in CLOSING
+            ):
+                end += 1
+            if end == len(text):
+                # The next token decides, e.g. "3." may continue as "3.14"
+                if final:
+                    yield end
+                return
+            if text[end].isspace() and not (
+                character == "." and self._is_abbreviation(text, i)
+            ):
+                yield end
+            i = end
+
+    @staticmethod
+    def _is_abbreviation(text, dot):
+        start = max(text.rfind(" ", 0, dot), text.rfind("\n", 0, dot)) + 1
+        word = text[start:dot].lstrip("\"'([{«“‘")
+        if word.lower() in ABBREVIATIONS or _DOTTED_ACRONYM.match(word):
+            return True
+        if len(word) == 1 and word.isupper():
+            return True  # An initial, as in "J. Smith"
+        # A numbered list item at the start of a line, as in "1. Preheat the oven"
+        return word.isdigit() and (start == 0 or text[start - 1] == "\n")
+
+    def _last_space(self):
+        """Returns the end of the longest prefix that fits into max_length and ends at a space."""
+        end = len(self.buffer)
+        while True:
+            space = self.buffer.rfind(" ", 0, end)
+            if space <= 0:
+                return end
+            if self.length(self.buffer[:space].strip()) <= self.max_length:
+                return space
+            end = space
+
+    def _cut(self, end):
+        unit = self.buffer[:end].strip()
+        self.buffer = self.buffer[end:].lstrip()
+        self.next_min_length = min(
+            self.min_length, max(self.next_min_length, 2 * self.length(unit))
+        )
+        return unit
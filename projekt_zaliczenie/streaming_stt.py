@@ -0,0 +1,167 @@
+import re
+import threading
+import numpy as np
+
+
+def _normalize(word: str) -> str:
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+def _agreed_prefix(previous: list, current: list) -> int:
+    """
+    Returns the number of leading words two hypotheses agree on, ignoring case and punctuation.
+    """
+    count = 0
+    for (previous_word, _), (current_word, _) in zip(previous, current):
+        if _normalize(previous_word) != _normalize(current_word):
+            break
+        count += 1
+    return count
+
+
+class StreamingTranscriber:
+    def __init__(
+        self,
+        model,
+        capture_buffer,
+        vad=None,
+        step_s: float = 0.5,
+        max_window_s: float = 15.0,
+        sample_rate: int = 16000,
+        on_partial=None,
+        **decode_options,
+    ):
+        """
+        Initializes the StreamingTranscriber class, which transcribes audio while it is still being recorded.
+
+        Every `step_s` seconds the uncommitted part of the recording is decoded again. Words on which two
+        consecutive hypotheses agree are committed, and the window then starts after the last committed word,
+        with the committed text as the decoding prompt. When recording ends only the short uncommitted tail
+        still has to be decoded.
+
+        Args:
+            model: A loaded Whisper model.
+            capture_buffer (AudioRingBuffer): The buffer the recording is written into.
+            vad (VoiceActivityDetector, optional): If given, decoding waits for speech to start and is limited
+            to the detected utterance. Defaults to None.
+            step_s (float, optional): The interval between decodes in seconds. Defaults to 0.5.
+            max_window_s (float, optional): The longest window decoded before words are committed without
+            agreement. Defaults to 15.
+            sample_rate (int, optional): The sample rate of the recording. Defaults to 16000.
+            on_partial (callable, optional): Called with the committed text and the current hypothesis after
+            every decode. Defaults to None.
+            **decode_options: Options passed to model.transcribe, e.g. fp16.
+        """
+        self.model = model
+        self.capture_buffer = capture_buffer
+        self.vad = vad
+        self.step_s = step_s
+        self.max_window_samples = int(max_window_s * sample_rate)
+        self.sample_rate = sample_rate
+        self.on_partial = on_partial
+        self.decode_options = decode_options
+
+        self.committed: list = []
+        self._hypothesis: list = []
+        self._window_start: int | None = None  # The first sample of the undecided part
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def committed_text(self) -> str:
+        return "".join(word for word, _ in self.committed).strip()
+
+    def _speech_range(self):
+        if self.vad is None:
+            return 0, self.capture_buffer.written
+        return self.vad.speech_range()
+
+    def _decode(self, start: int, end: int) -> list:
+        """
+        Decodes the recording between two positions.
+
+        Returns:
+            list: (word, end position) pairs of the hypothesis.
+        """
+        audio_np = self.capture_buffer.view(start, end).astype(np.float32) / 32768.0
+        result = self.model.transcribe(
+            audio_np,
+            initial_prompt=self.committed_text or None,
+            word_timestamps=True,
+            condition_on_previous_text=False,
+            **self.decode_options,
+        )
+        return [
+            (word["word"], start + int(word["end"] * self.sample_rate))
+            for segment in result["segments"]
+            for word in segment.get("words", [])
+        ]
+
+    def _commit(self, words: list):
+        if words:
+            self.committed.extend(words)
+            self._window_start = words[-1][1]
+
+    def update(self):
+        """
+        Decodes the current window once and commits the words both this and the previous hypothesis agree on.
+
+        Returns:
+            None
+        """
+        speech_range = self._speech_range()
+        if speech_range is None:
+            return
+        start, end = speech_range
+        if self._window_start is None:
+            self._window_start = start
+        if end - self._window_start < self.sample_rate // 2:
+            return
+
+        hypothesis = self._decode(self._window_start, end)
+        agreed = _agreed_prefix(self._hypothesis, hypothesis)
+        if end - self._window_start > self.max_window_samples:
+            # Keep the window bounded even if the hypotheses keep changing
+            agreed = max(agreed, len(hypothesis) - 2)
+        self._commit(hypothesis[:agreed])
+        self._hypothesis = hypothesis[agreed:]
+
+        if self.on_partial is not None:
+            self.on_partial(
+                self.committed_text,
+                "".join(word for word, _ in self._hypothesis).strip(),
+            )
+
+    def _run(self):
+        while not self._stop.wait(self.step_s):
+            self.update()
+
+    def start(self):
+        """
+        Starts decoding in a background thread.
+
+        Returns:
+            None
+        """
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def finish(self) -> str:
+        """
+        Stops the background thread and decodes the remaining tail of the recording.
+
+        Returns:
+            str: The final transcript.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+        speech_range = self._speech_range()
+        if speech_range is not None:
+            start, end = speech_range
+            if self._window_start is None:
+                self._window_start = start
+            if end > self._window_start:
+                self._commit(self._decode(self._window_start, end))
+        return self.committed_text
@@ -0,0 +1,152 @@
+import math
+import threading
+import dataclasses
+import torch
+import whisper
+import numpy as np
+from whisper.audio import SAMPLE_RATE, HOP_LENGTH
+
+PRECISIONS = ("fp32", "fp16", "int8")
+AUDIO_CONTEXTS = ("full", "dynamic")
+
+# Options of whisper's transcribe that the dynamic context path honours
+_DYNAMIC_OPTIONS = {"fp16", "language", "initial_prompt"}
+
+
+def _quantize_linear_layers(model):
+    """
+    Applies dynamic int8 quantization to the linear layers of a Whisper model on the CPU.
+    """
+    # Whisper's Linear subclass only casts its weights to the input dtype, which is a no-op in fp32. The
+    # quantizer matches exact module types, so turn the subclass back into plain nn.Linear first.
+    for module in model.modules():
+        if isinstance(module, torch.nn.Linear):
+            module.__class__ = torch.nn.Linear
+    return torch.ao.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8
+    )
+
+
+class SpeechToTextService:
+    def __init__(
+        self,
+        model_name: str = "base.en",
+        device: str = "cuda" if torch.cuda.is_available() else "cpu",
+        precision: str | None = None,
+        audio_context: str = "full",
+        max_dynamic_s: float = 10.0,
+        context_margin_s: float = 1.0,
+    ):
+        """
+        Initializes the SpeechToTextService class, a Whisper model loaded at a given numeric precision.
+
+        Args:
+            model_name (str, optional): The Whisper model to load. Defaults to "base.en".
+            device (str, optional): The device to be used for the model, either "cuda" if a GPU is available or "cpu".
+            Defaults to "cuda" if available, otherwise "cpu".
+            precision (str, optional): The numeric precision of the model: "fp32", "fp16" or "int8". "fp16" is only
+            available on a GPU; on the CPU Whisper would silently fall back to fp32. "int8" applies dynamic
+            quantization to the linear layers of the encoder and decoder and is only available on the CPU.
+            Defaults to None, which is "fp16" on a GPU and "fp32" on the CPU.
+            audio_context (str, optional): "full" pads every input to Whisper's 30 s window. "dynamic" encodes
+            utterances of up to `max_dynamic_s` over their own length plus `context_margin_s`, which makes the
+            encoder several times cheaper for short commands at a small cost in accuracy. Defaults to "full".
+            max_dynamic_s (float, optional): The longest utterance encoded with a reduced context. Defaults to 10.
+            context_margin_s (float, optional): The silence added after the utterance in the reduced context;
+            Whisper tends to cut off the last word without it. Defaults to 1.
+        """
+        if precision is None:
+            precision = "fp32" if device == "cpu" else "fp16"
+        if precision not in PRECISIONS:
+            raise ValueError(
+                f"Unknown precision {precision!r}, expected one of {PRECISIONS}"
+            )
+        if precision == "int8" and device != "cpu":
+            raise ValueError("int8 precision is only supported on the CPU")
+        if precision == "fp16" and device == "cpu":
+            raise ValueError("fp16 precision is not supported on the CPU")
+        if audio_context not in AUDIO_CONTEXTS:
+            raise ValueError(
+                f"Unknown audio context {audio_context!r}, expected one of {AUDIO_CONTEXTS}"
+            )
+
+        self.device = device
+        self.precision = precision
+        self.model_name = model_name
+        self.audio_context = audio_context
+        self.max_dynamic_samples = int(max_dynamic_s * SAMPLE_RATE)
+        self.context_margin_samples = int(context_margin_s * SAMPLE_RATE)
+        # The dynamic path temporarily shortens the encoder, so no call may overlap it, on either path
+        self._lock = threading.Lock()
+        self.model = whisper.load_model(model_name, device=device)
+        if precision == "int8":
+            self.model = _quantize_linear_layers(self.model)
+
+    def transcribe(self, audio: np.ndarray, **options) -> dict:
+        """
+        Transcribes the given audio with options matching the precision of the model.
+
+        Args:
+            audio (numpy.ndarray): 16 kHz mono float32 audio.
+            **options: Further options passed to whisper's transcribe, e.g. word_timestamps.
+
+        Returns:
+            dict: The result of whisper's transcribe, with the text and the segments.
+        """
+        options.setdefault("fp16", self.precision == "fp16")
+        with self._lock:
+            if (
+                self.audio_context == "dynamic"
+                and len(audio) <= self.max_dynamic_samples
+                and set(options) <= _DYNAMIC_OPTIONS
+            ):
+                return self._transcribe_dynamic(audio, **options)
+            return self.model.transcribe(audio, **options)
+
+    def _transcribe_dynamic(
+        self, audio: np.ndarray, fp16: bool, language=None, initial_prompt=None
+    ) -> dict:
+        """
+        Decodes a short utterance with the encoder context cut down to the length of the audio. Called with
+        the lock held.
+        """
+        duration = len(audio) / SAMPLE_RATE
+        # The encoder convolutions halve the number of mel frames, so keep it even
+        frames = 2 * math.ceil(
+            (len(audio) + self.context_margin_samples) / HOP_LENGTH / 2
+        )
+        frames = min(frames, self.model.dims.n_audio_ctx * 2)
+        audio = whisper.pad_or_trim(
+            torch.from_numpy(np.asarray(audio, dtype=np.float32)), frames * HOP_LENGTH
+        )
+        mel = whisper.log_mel_spectrogram(audio, self.model.dims.n_mels).to(
+            self.model.device
+        )[:, :frames]
+        options = whisper.DecodingOptions(
+            fp16=fp16,
+            language=language,
+            prompt=initial_prompt,
+            without_timestamps=True,
+        )
+
+        encoder = self.model.encoder
+        positional_embedding, dims = encoder.positional_embedding, self.model.dims
+        try:
+            # The encoder checks its input against the positional embedding and the decoder decides from
+            # dims whether it got mel frames or encoded features, so shorten both for this call
+            encoder.positional_embedding = positional_embedding[: frames // 2]
+            self.model.dims = dataclasses.replace(dims, n_audio_ctx=frames // 2)
+            result = whisper.decode(self.model, mel, options)
+        finally:
+            encoder.positional_embedding = positional_embedding
+            self.model.dims = dims
+
+        text = result.text.strip()
+        # The same check whisper's transcribe uses to drop hallucinations on silence
+        if result.no_speech_prob > 0.6 and result.avg_logprob < -1.0:
+            text = ""
+        return {
+            "text": text,
+            "segments": [{"start": 0.0, "end": duration, "text": text}],
+            "language": result.language,
+        }
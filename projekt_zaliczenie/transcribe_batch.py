@@ -0,0 +1,174 @@
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from workers import default_worker_count
+from vad import trim_silence
+
+# Approximate resident memory of one worker holding a loaded Whisper base model
+WORKER_MEMORY_BYTES = 1024**3
+AUDIO_EXTENSIONS = (".wav", ".raw", ".pcm")
+
+_service = None
+
+
+def find_audio_files(paths: list) -> list:
+    """
+    Expands files and directories into a sorted list of audio files.
+
+    Args:
+        paths (list): Audio files and directories, which are searched recursively.
+
+    Returns:
+        list: The paths of the audio files.
+    """
+    files: list[str] = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(
+                    os.path.join(root, name)
+                    for name in names
+                    if name.lower().endswith(AUDIO_EXTENSIONS)
+                )
+        else:
+            files.append(path)
+    return sorted(files)
+
+
+def load_audio(path: str) -> np.ndarray:
+    """
+    Loads a WAV file in any format, or a headerless file of 16 kHz mono int16 samples, as float32 audio.
+    """
+    if path.lower().endswith(".wav"):
+        import whisper
+
+        return whisper.load_audio(path)
+    return np.fromfile(path, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def _init_worker(num_threads: int, service_kwargs: dict):
+    global _service
+    import torch
+    from stt import SpeechToTextService
+
+    torch.set_num_threads(num_threads)
+    _service = SpeechToTextService(device="cpu", **service_kwargs)
+
+
+def _transcribe(path: str, trim: bool) -> dict:
+    start = time.perf_counter()
+    audio = load_audio(path)
+    audio_seconds = len(audio) / 16000
+    if trim:
+        audio = trim_silence(audio)
+    load_seconds = time.perf_counter() - start
+
+    assert _service is not None, "_init_worker runs in every worker before any task"
+    start = time.perf_counter()
+    text = _service.transcribe(audio)["text"].strip() if len(audio) else ""
+    transcribe_seconds = time.perf_counter() - start
+
+    return {
+        "file": path,
+        "text": text,
+        "audio_seconds": audio_seconds,
+        "load_seconds": load_seconds,
+        "transcribe_seconds": transcribe_seconds,
+        "real_time_factor": (
+            transcribe_seconds / audio_seconds if audio_seconds else None
+        ),
+        "worker": os.getpid(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Transcribe WAV and raw 16 kHz int16 files with a pool of Whisper workers. "
+        "Results are written as JSON lines, the throughput summary goes to stderr."
+    )
+    parser.add_argument("paths", nargs="+", help="Audio files and directories")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Number of worker processes; defaults to what fits into the available memory",
+    )
+    parser.add_argument("--model", default="base.en", help="Whisper model")
+    parser.add_argument(
+        "--precision",
+        default="fp32",
+        choices=["fp32", "int8"],
+        help="Whisper precision",
+    )
+    parser.add_argument(
+        "--audio-context",
+        default="full",
+        choices=["full", "dynamic"],
+        help="Whisper audio context, see SpeechToTextService",
+    )
+    parser.add_argument(
+        "--trim",
+        action="store_true",
+        help="Trim leading and trailing silence before transcription",
+    )
+    parser.add_argument(
+        "--output", help="Write the JSON lines to this file instead of stdout"
+    )
+    args = parser.parse_args()
+
+    files = find_audio_files(args.paths)
+    if not files:
+        parser.error("No audio files found")
+
+    workers = min(len(files), args.workers or default_worker_count(WORKER_MEMORY_BYTES))
+    service_kwargs = {
+        "model_name": args.model,
+        "precision": args.precision,
+        "audio_context": args.audio_context,
+    }
+    output = open(args.output, "w") if args.output else sys.stdout
+
+    start = time.perf_counter()
+    audio_seconds = 0.0
+    failed = 0
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(max(1, (os.cpu_count() or 1) // workers), service_kwargs),
+    ) as executor:
+        futures = {
+            executor.submit(_transcribe, path, args.trim): path for path in files
+        }
+        # Write every result as soon as it is ready, so long runs can be followed and resumed
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+                audio_seconds += result["audio_seconds"]
+            except Exception as e:
+                failed += 1
+                result = {"file": futures[future], "error": str(e)}
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+    wall_seconds = time.perf_counter() - start
+
+    summary = {
+        "files": len(files),
+        "failed": failed,
+        "workers": workers,
+        "wall_seconds": wall_seconds,
+        "audio_seconds": audio_seconds,
+        "files_per_second": len(files) / wall_seconds,
+        "audio_seconds_per_second": audio_seconds / wall_seconds,
+    }
+    print(json.dumps(summary), file=sys.stderr)
+    if args.output:
+        output.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+import threading
+from typing import NamedTuple
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def _mel_filterbank(sample_rate: int, n_fft: int, n_mels: int) -> np.ndarray:
+    """
+    Returns triangular filters of shape (n_mels, n_fft // 2 + 1), spaced evenly on the mel scale.
+    """
+    mel_max = 2595.0 * np.log10(1.0 + (sample_rate / 2) / 700.0)
+    hz = 700.0 * (10 ** (np.linspace(0.0, mel_max, n_mels + 2) / 2595.0) - 1.0)
+    bins = np.fft.rfftfreq(n_fft, 1.0 / sample_rate)
+    lower, center, upper = hz[:-2, None], hz[1:-1, None], hz[2:, None]
+    rising = (bins - lower) / (center - lower)
+    falling = (upper - bins) / (upper - center)
+    return np.maximum(0.0, np.minimum(rising, falling)).astype(np.float32)
+
+
+class Fingerprint(NamedTuple):
+    # Packed: every cell against its frame's mean, then against its band's mean
+    bits: np.ndarray
+    # Packed: the cells above the noise floor, the only ones that are compared
+    mask: np.ndarray
+    active_frames: int  # The length of the part above the energy gate, in 10 ms frames
+    coverage: float  # The fraction of cells above the noise floor
+
+
+def fingerprint(
+    audio: np.ndarray,
+    sample_rate: int = 16000,
+    n_mels: int = 32,
+    n_frames: int = 24,
+    gate_db: float = 25.0,
+    dynamic_range_db: float = 35.0,
+) -> Fingerprint:
+    """
+    Computes a compact fingerprint of a short clip from its log-mel spectrogram.
+
+    Frames more than `gate_db` below the loudest one are cut from both ends, so leading and trailing silence
+    or noise do not shift the clip. The rest is averaged into a fixed number of frames, so small differences
+    in speaking rate do not matter. Every cell is quantized against the clip's own statistics: one bit for
+    whether it is louder than the mean of its frame (the spectral shape) and one for whether it is louder than
+    the mean of its band (the loudness contour), so the bits do not depend on the recording level. Cells more
+    than `dynamic_range_db` below the loudest one are masked out: they hold background noise, whose bits are
+    random.
+
+    Args:
+        audio (numpy.ndarray): Mono float audio.
+        sample_rate (int, optional): The sample rate of the audio. Defaults to 16000.
+        n_mels (int, optional): The number of mel bands. Defaults to 32.
+        n_frames (int, optional): The number of frames the clip is averaged into. Defaults to 24.
+        gate_db (float, optional): The level below the loudest frame that counts as silence. Defaults to 25.
+        dynamic_range_db (float, optional): The range below the loudest cell that is compared. Defaults to 35.
+
+    Returns:
+        Fingerprint: The packed bits and mask of 2 * n_mels * n_frames cells, the active length and the
+        fraction of cells above the noise floor.
+    """
+    window_samples = sample_rate // 40
+    hop_samples = sample_rate // 100
+    n_fft = 1 << (window_samples - 1).bit_length()
+
+    audio = np.asarray(audio, dtype=np.float32)
+    if len(audio) < window_samples:
+        audio = np.pad(audio, (0, window_samples - len(audio)))
+    frames = sliding_window_view(audio, window_samples)[::hop_samples]
+    power = np.abs(np.fft.rfft(frames * np.hanning(window_samples), n=n_fft)) ** 2
+    mel = power @ _mel_filterbank(sample_rate, n_fft, n_mels).T
+
+    energy = mel.sum(axis=1)
+    active = np.flatnonzero(energy > energy.max() * 10 ** (-gate_db / 10))
+    if len(active) == 0:
+        active = np.arange(len(mel))
+    mel = mel[active[0] : active[-1] + 1]
+    active_frames = len(mel)
+    if len(mel) < n_frames:
+        mel = np.repeat(mel, -(-n_frames // len(mel)), axis=0)
+
+    starts = np.linspace(0, len(mel), n_frames, endpoint=False).astype(int)
+    lengths = np.diff(np.append(starts, len(mel)))
+    grid = 10 * np.log10(np.add.reduceat(mel, starts) / lengths[:, None] + 1e-12)
+    floor = grid.max() - dynamic_range_db
+    mask = grid > floor
+    grid = np.maximum(grid, floor)
+
+    bits = np.concatenate(
+        [
+            (grid > grid.mean(axis=1, keepdims=True)).ravel(),
+            (grid > grid.mean(axis=0, keepdims=True)).ravel(),
+        ]
+    )
+    return Fingerprint(
+        np.packbits(bits),
+        np.packbits(np.concatenate([mask.ravel(), mask.ravel()])),
+        active_frames,
+        float(mask.mean()),
+    )
+
+
+def distance(a: Fingerprint, b: Fingerprint) -> float:
+    """
+    Returns the fraction of differing bits among the cells that are above the noise floor in either clip.
+    """
+    union = a.mask | b.mask
+    differing = np.unpackbits((a.bits ^ b.bits) & union).sum()
+    return float(differing / max(np.unpackbits(union).sum(), 1))
+
+
+class TranscriptCache:
+    def __init__(
+        self,
+        max_entries: int = 256,
+        max_seconds: float = 3.0,
+        threshold: float = 0.1,
+        duration_tolerance: float = 0.2,
+        min_coverage: float = 0.2,
+        sample_rate: int = 16000,
+    ):
+        """
+        Initializes the TranscriptCache class, an in-memory cache of transcripts of short clips keyed on an
+        audio fingerprint, so that repeated commands such as "stop" skip the speech recognition model.
+
+        A clip matches a cached one when the lengths of their non-silent parts differ by at most
+        `duration_tolerance` and the fraction of differing fingerprint bits is at most `threshold`. Clips
+        whose spectrogram is mostly below the noise floor, such as a whistle or a tone, carry too little to
+        be matched safely and are neither cached nor looked up. The least recently used entry is evicted
+        first. The default threshold lies below every distance between different words measured by
+        bench_transcript_cache.py; run it after changing the fingerprint.
+
+        Args:
+            max_entries (int, optional): The number of cached transcripts. Defaults to 256.
+            max_seconds (float, optional): Longer clips are neither cached nor looked up. Defaults to 3.
+            threshold (float, optional): The largest fraction of differing bits of a match. Defaults to 0.1.
+            duration_tolerance (float, optional): The largest relative length difference of a match.
+            Defaults to 0.2.
+            min_coverage (float, optional): The smallest fraction of cells above the noise floor of a clip
+            that is cached. Defaults to 0.2.
+            sample_rate (int, optional): The sample rate of the clips. Defaults to 16000.
+        """
+        self.max_entries = max_entries
+        self.max_samples = int(max_seconds * sample_rate)
+        self.threshold = threshold
+        self.duration_tolerance = duration_tolerance
+        self.min_coverage = min_coverage
+        self.sample_rate = sample_rate
+
+        n_bytes = len(fingerprint(np.zeros(1, dtype=np.float32), sample_rate).bits)
+        self._bits = np.zeros((max_entries, n_bytes), dtype=np.uint8)
+        self._masks = np.zeros((max_entries, n_bytes), dtype=np.uint8)
+        self._lengths = np.zeros(max_entries, dtype=np.int64)
+        self._last_used = np.zeros(max_entries, dtype=np.int64)
+        self._texts: list[str] = []
+        self._clock = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, audio: np.ndarray) -> Fingerprint | None:
+        if not 0 < len(audio) <= self.max_samples:
+            return None
+        key = fingerprint(audio, self.sample_rate)
+        if key.coverage < self.min_coverage:
+            return None
+        return key
+
+    def get(self, audio: np.ndarray) -> str | None:
+        """
+        Returns the transcript of a cached clip similar to the given one.
+
+        Args:
+            audio (numpy.ndarray): Mono float audio.
+
+        Returns:
+            str: The cached transcript, or None if there is no similar clip.
+        """
+        key = self._key(audio)
+        if key is None:
+            return None
+        with self._lock:
+            count = len(self._texts)
+            lengths = self._lengths[:count]
+            similar_length = np.abs(
+                lengths - key.active_frames
+            ) <= self.duration_tolerance * np.maximum(lengths, key.active_frames)
+            union = self._masks[:count] | key.mask
+            differing = np.unpackbits((self._bits[:count] ^ key.bits) & union, axis=1)
+            distances = differing.sum(axis=1) / np.maximum(
+                np.unpackbits(union, axis=1).sum(axis=1), 1
+            )
+            distances[~similar_length] = 1.0
+            if count == 0 or distances.min() > self.threshold:
+                self.misses += 1
+                return None
+            index = int(distances.argmin())
+            self._clock += 1
+            self._last_used[index] = self._clock
+            self.hits += 1
+            return self._texts[index]
+
+    def put(self, audio: np.ndarray, text: str):
+        """
+        Caches the transcript of a clip, replacing the least recently used entry when the cache is full.
+
+        Args:
+            audio (numpy.ndarray): Mono float audio.
+            text (str): Its transcript.
+
+        Returns:
+            None
+        """
+        key = self._key(audio)
+        if key is None:
+            return
+        with self._lock:
+            if len(self._texts) < self.max_entries:
+                index = len(self._texts)
+                self._texts.append(text)
+            else:
+                index = int(self._last_used.argmin())
+                self._texts[index] = text
+            self._bits[index] = key.bits
+            self._masks[index] = key.mask
+            self._lengths[index] = key.active_frames
+            self._clock += 1
+            self._last_used[index] = self._clock
@@ -1,29 +1,167 @@
 import nltk
 import torch
 import warnings
-import numpy as np
+from collections import OrderedDict
 from transformers import AutoProcessor, BarkModel
+from audio_buffer import (
+    AudioBuffer,
+    SECONDS_PER_CHARACTER,
+    SENTENCE_PAUSE_SECONDS,
+    with_pauses,
+)
 
 warnings.filterwarnings(
     "ignore",
     message="torch.nn.utils.weight_norm is deprecated in favor of torch.nn.utils.parametrizations.weight_norm.",
 )
 
+PRECISIONS = ("fp32", "bf16", "int8")
+
+
+def _length_buckets(texts, batch_size):
+    """
+    Groups text indices into batches of similar length, so that padding and generation time are shared evenly.
+
+    Args:
+        texts (list): The texts to be grouped.
+        batch_size (int): The maximum number of texts in a single batch.
+
+    Returns:
+        list: A list of lists of indices into `texts`.
+    """
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    return [order[i : i + batch_size] for i in range(0, len(order), batch_size)]
+
 
 class TextToSpeechService:
-    def __init__(self, device: str = "cuda" if torch.cuda.is_available() else "cpu"):
+    def __init__(
+        self,
+        device: str = "cuda" if torch.cuda.is_available() else "cpu",
+        voice_preset_cache_size: int = 4,
+        audio_cache=None,
+        precision: str = "fp32",
+        compile: bool = False,
+        attn_implementation: str | None = None,
+    ):
         """
         Initializes the TextToSpeechService class.
 
         Args:
             device (str, optional): The device to be used for the model, either "cuda" if a GPU is available or "cpu".
             Defaults to "cuda" if available, otherwise "cpu".
+            voice_preset_cache_size (int, optional): The number of processed voice presets kept on the device.
+            Defaults to 4.
+            audio_cache (AudioCache, optional): An on-disk cache of synthesized sentences. Cached sentences are
+            returned without invoking the model. Defaults to None, which disables caching.
+            precision (str, optional): The numeric precision of the model: "fp32", "bf16" or "int8". "int8" applies
+            dynamic quantization to the linear layers and is only available on the CPU. Defaults to "fp32".
+            compile (bool, optional): Whether to compile the forward passes of the Bark sub-models with torch.compile.
+            The first generations are slower while the graphs are built, so combine it with `warmup`.
+            Defaults to False.
+            attn_implementation (str, optional): The attention implementation passed to BarkModel.from_pretrained,
+            e.g. "flash_attention_2" on a supported GPU with bf16. Defaults to None, the standard implementation.
         """
+        if precision not in PRECISIONS:
+            raise ValueError(
+                f"Unknown precision {precision!r}, expected one of {PRECISIONS}"
+            )
+        if precision == "int8" and device != "cpu":
+            raise ValueError("int8 precision is only supported on the CPU")
+        if (
+            precision == "bf16"
+            and device.startswith("cuda")
+            and not torch.cuda.is_bf16_supported()
+        ):
+            raise ValueError(f"bf16 precision is not supported on {device}")
+
         self.device = device
-        self.processor = AutoProcessor.from_pretrained("suno/bark-small")
-        self.model = BarkModel.from_pretrained("suno/bark-small")
+        self.precision = precision
+        self.model_name = "suno/bark-small"
+        self.voice_preset_cache_size = voice_preset_cache_size
+        self._voice_presets = OrderedDict()  # type: ignore[var-annotated]
+        self.audio_cache = audio_cache
+        self.processor = AutoProcessor.from_pretrained(self.model_name)
+        self.model = BarkModel.from_pretrained(
+            self.model_name, attn_implementation=attn_implementation
+        )
+        if precision == "int8":
+            self.model = torch.ao.quantization.quantize_dynamic(
+                self.model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+        elif precision == "bf16":
+            self.model.to(torch.bfloat16)
         self.model.to(self.device)
 
+        if compile:
+            # generate() is a method of each sub-model, so compile their forward passes rather than the modules
+            for sub_model in (
+                self.model.semantic,
+                self.model.coarse_acoustics,
+                self.model.fine_acoustics,
+            ):
+                sub_model.forward = torch.compile(sub_model.forward, dynamic=True)
+
+    def warmup(self, voice_preset: str = "v2/en_speaker_1"):
+        """
+        Runs a short dummy generation, so that kernel selection, allocator growth and graph compilation
+        happen before the first real request. The audio cache is bypassed.
+
+        Args:
+            voice_preset (str, optional): The voice preset to load while warming up. Defaults to "v2/en_speaker_1".
+
+        Returns:
+            None
+        """
+        inputs = self._prepare_inputs("Hello.", voice_preset)
+        with torch.no_grad():
+            self.model.generate(**inputs, pad_token_id=10000)
+
+    def _load_voice_preset(self, voice_preset: str):
+        """
+        Returns the processed speaker history prompt for the given voice preset, already moved to the device.
+        Presets are loaded on first use and kept in a small LRU cache.
+
+        Args:
+            voice_preset (str): The name of the voice preset.
+
+        Returns:
+            dict: The history prompt tensors expected by BarkModel.generate.
+        """
+        if voice_preset in self._voice_presets:
+            self._voice_presets.move_to_end(voice_preset)
+            return self._voice_presets[voice_preset]
+
+        history_prompt = self.processor(
+            "", voice_preset=voice_preset, return_tensors="pt"
+        )["history_prompt"].to(self.device)
+        self._voice_presets[voice_preset] = history_prompt
+        if len(self._voice_presets) > self.voice_preset_cache_size:
+            self._voice_presets.popitem(last=False)
+        return history_prompt
+
+    def _prepare_inputs(self, text, voice_preset: str):
+        """
+        Tokenizes the given text (or list of texts) and attaches the cached voice preset.
+
+        Args:
+            text (str or list): The input text(s) to be synthesized.
+            voice_preset (str): The name of the voice preset.
+
+        Returns:
+            dict: The keyword arguments for BarkModel.generate.
+        """
+        inputs = self.processor(text, return_tensors="pt")
+        inputs = {k: v.to(self.device) for k, v in inputs.items()}
+        inputs["history_prompt"] = self._load_voice_preset(voice_preset)
+        return inputs
+
+    def _cache_key(self, text: str, voice_preset: str) -> str:
+        return self.audio_cache.key(
+            text,
+            voice=f"{self.model_name}:{self.precision}:{voice_preset}",
+            sample_rate=self.model.generation_config.sample_rate,
+        )
+
     def synthesize(self, text: str, voice_preset: str = "v2/en_speaker_1"):
         """
         Synthesizes audio from the given text using the specified voice preset.
@@ -35,33 +173,135 @@ class TextToSpeechService:
         Returns:
             tuple: A tuple containing the sample rate and the generated audio array.
         """
-        inputs = self.processor(text, voice_preset=voice_preset, return_tensors="pt")
-        inputs = {k: v.to(self.device) for k, v in inputs.items()}
+        sample_rate = self.model.generation_config.sample_rate
+        if self.audio_cache is not None:
+            cache_key = self._cache_key(text, voice_preset)
+            audio_array = self.audio_cache.get(cache_key)
+            if audio_array is not None:
+                return sample_rate, audio_array
+
+        inputs = self._prepare_inputs(text, voice_preset)
 
         with torch.no_grad():
             audio_array = self.model.generate(**inputs, pad_token_id=10000)
 
-        audio_array = audio_array.cpu().numpy().squeeze()
-        sample_rate = self.model.generation_config.sample_rate
+        audio_array = audio_array.cpu().float().numpy().squeeze()
+        if self.audio_cache is not None:
+            self.audio_cache.put(cache_key, audio_array)
         return sample_rate, audio_array
 
-    def long_form_synthesize(self, text: str, voice_preset: str = "v2/en_speaker_1"):
+    def synthesize_batch(self, texts: list, voice_preset: str = "v2/en_speaker_1"):
+        """
+        Synthesizes audio for several texts with a single batched generation call.
+
+        Args:
+            texts (list): The input texts to be synthesized.
+            voice_preset (str, optional): The voice preset to be used for the synthesis. Defaults to "v2/en_speaker_1".
+
+        Returns:
+            tuple: A tuple containing the sample rate and a list with one audio array per input text.
+        """
+        inputs = self._prepare_inputs(texts, voice_preset)
+
+        with torch.no_grad():
+            audio_arrays, output_lengths = self.model.generate(
+                **inputs, pad_token_id=10000, return_output_lengths=True
+            )
+
+        audio_arrays = audio_arrays.cpu().float().numpy()
+        sample_rate = self.model.generation_config.sample_rate
+        return sample_rate, [
+            audio_array[:length]
+            for audio_array, length in zip(audio_arrays, output_lengths.tolist())
+        ]
+
+    def stream_synthesize(self, text: str, voice_preset: str = "v2/en_speaker_1"):
+        """
+        Synthesizes the given long-form text sentence by sentence, yielding each piece of audio as soon as it is ready.
+        The same pause as in long_form_synthesize is yielded as a chunk of silence between the sentences.
+
+        Args:
+            text (str): The input text to be synthesized.
+            voice_preset (str, optional): The voice preset to be used for the synthesis. Defaults to "v2/en_speaker_1".
+
+        Yields:
+            tuple: A tuple containing the sample rate and the audio array of a single sentence or of a pause.
+        """
+        yield from with_pauses(
+            self.synthesize(sent, voice_preset) for sent in nltk.sent_tokenize(text)
+        )
+
+    def _synthesize_sentences_batched(
+        self, sentences: list, voice_preset: str, batch_size: int
+    ) -> list:
+        """
+        Synthesizes the given sentences in batches of similar length, skipping sentences that are already cached.
+
+        Args:
+            sentences (list): The sentences to be synthesized.
+            voice_preset (str): The voice preset to be used for the synthesis.
+            batch_size (int): The maximum number of sentences generated together.
+
+        Returns:
+            list: One audio array per sentence, in the original order.
+        """
+        audio_arrays: list = [None] * len(sentences)
+        if self.audio_cache is not None:
+            for i, sent in enumerate(sentences):
+                audio_arrays[i] = self.audio_cache.get(
+                    self._cache_key(sent, voice_preset)
+                )
+        missing = [
+            i for i, audio_array in enumerate(audio_arrays) if audio_array is None
+        ]
+
+        for bucket in _length_buckets([sentences[i] for i in missing], batch_size):
+            indices = [missing[j] for j in bucket]
+            _, batch_audio = self.synthesize_batch(
+                [sentences[i] for i in indices], voice_preset
+            )
+            for i, audio_array in zip(indices, batch_audio):
+                audio_arrays[i] = audio_array
+                if self.audio_cache is not None:
+                    self.audio_cache.put(
+                        self._cache_key(sentences[i], voice_preset), audio_array
+                    )
+        return audio_arrays
+
+    def long_form_synthesize(
+        self, text: str, voice_preset: str = "v2/en_speaker_1", batch_size: int = 1
+    ):
         """
         Synthesizes audio from the given long-form text using the specified voice preset.
 
         Args:
             text (str): The input text to be synthesized.
             voice_preset (str, optional): The voice preset to be used for the synthesis. Defaults to "v2/en_speaker_1".
+            batch_size (int, optional): The number of sentences generated together. Sentences are grouped into
+            batches of similar length. Defaults to 1, which synthesizes one sentence at a time.
 
         Returns:
             tuple: A tuple containing the sample rate and the generated audio array.
         """
-        pieces = []
+        sample_rate = self.model.generation_config.sample_rate
+        silence_samples = int(SENTENCE_PAUSE_SECONDS * sample_rate)
         sentences = nltk.sent_tokenize(text)
-        silence = np.zeros(int(0.25 * self.model.generation_config.sample_rate))
+        buffer = AudioBuffer(
+            int(len(text) * SECONDS_PER_CHARACTER * sample_rate)
+            + len(sentences) * silence_samples
+        )
+
+        if batch_size > 1:
+            audio_arrays = iter(
+                self._synthesize_sentences_batched(sentences, voice_preset, batch_size)
+            )
+        else:
+            audio_arrays = (
+                self.synthesize(sent, voice_preset)[1] for sent in sentences
+            )
 
-        for sent in sentences:
-            sample_rate, audio_array = self.synthesize(sent, voice_preset)
-            pieces += [audio_array, silence.copy()]
+        for audio_array in audio_arrays:
+            buffer.append(audio_array)
+            buffer.append_silence(silence_samples)
 
-        return self.model.generation_config.sample_rate, np.concatenate(pieces)
+        return sample_rate, buffer.finalize()
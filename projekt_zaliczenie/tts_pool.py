@@ -0,0 +1,149 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import nltk
+from audio_buffer import (
+    AudioBuffer,
+    SECONDS_PER_CHARACTER,
+    SENTENCE_PAUSE_SECONDS,
+    with_pauses,
+)
+from workers import default_worker_count
+
+# Approximate resident memory of one worker holding a loaded suno/bark-small model
+WORKER_MEMORY_BYTES = 2 * 1024**3
+
+_service = None
+_started = None
+
+
+def _init_worker(num_threads: int, service_kwargs: dict, started):
+    global _service, _started
+    _started = started
+    import torch
+    from tts import TextToSpeechService
+
+    # Split the cores between the workers instead of letting every worker claim all of them
+    torch.set_num_threads(num_threads)
+    _service = TextToSpeechService(device="cpu", **service_kwargs)
+    _service.warmup()
+
+
+def _ready():
+    # A worker blocked here cannot take another _ready task, so the barrier opens only once every worker
+    # has finished _init_worker and picked up one of them
+    assert _started is not None
+    _started.wait()
+
+
+def _synthesize(text: str, voice_preset: str):
+    assert _service is not None, "_init_worker runs in every worker before any task"
+    return _service.synthesize(text, voice_preset)
+
+
+class SynthesisPool:
+    def __init__(self, workers: int | None = None, **service_kwargs):
+        """
+        Initializes the SynthesisPool class, which synthesizes sentences in parallel worker processes.
+
+        Every worker holds its own TextToSpeechService on the CPU. The pool offers the same synthesis methods
+        as TextToSpeechService, so it can be used in its place.
+
+        Args:
+            workers (int, optional): The number of worker processes. Defaults to None, which sizes the pool from
+            the available memory and the number of cores.
+            **service_kwargs: Keyword arguments passed to TextToSpeechService in every worker, e.g. precision.
+        """
+        self.workers = workers or default_worker_count(WORKER_MEMORY_BYTES)
+        num_threads = max(1, (os.cpu_count() or 1) // self.workers)
+        context = multiprocessing.get_context("spawn")
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(num_threads, service_kwargs, context.Barrier(self.workers)),
+        )
+
+    def warmup(self):
+        """
+        Starts every worker and waits until each one has loaded and warmed up its model.
+
+        Every worker reports in exactly once: each of the submitted tasks waits on a barrier shared by all
+        workers, so a worker that is ready early cannot answer for the ones still loading.
+
+        Returns:
+            None
+        """
+        for future in [self.executor.submit(_ready) for _ in range(self.workers)]:
+            future.result()
+
+    def synthesize(self, text: str, voice_preset: str = "v2/en_speaker_1"):
+        """
+        Synthesizes audio from the given text in one of the workers.
+
+        Args:
+            text (str): The input text to be synthesized.
+            voice_preset (str, optional): The voice preset to be used for the synthesis. Defaults to "v2/en_speaker_1".
+
+        Returns:
+            tuple: A tuple containing the sample rate and the generated audio array.
+        """
+        return self.executor.submit(_synthesize, text, voice_preset).result()
+
+    def stream_synthesize(self, text: str, voice_preset: str = "v2/en_speaker_1"):
+        """
+        Farms out all sentences of the given text to the workers at once and yields their audio in order, with a
+        chunk of silence between the sentences.
+
+        Args:
+            text (str): The input text to be synthesized.
+            voice_preset (str, optional): The voice preset to be used for the synthesis. Defaults to "v2/en_speaker_1".
+
+        Yields:
+            tuple: A tuple containing the sample rate and the audio array of a single sentence or of a pause.
+        """
+        sentences = nltk.sent_tokenize(text)
+        yield from with_pauses(
+            self.executor.map(_synthesize, sentences, [voice_preset] * len(sentences))
+        )
+
+    def long_form_synthesize(self, text: str, voice_preset: str = "v2/en_speaker_1"):
+        """
+        Synthesizes audio from the given long-form text, one sentence per worker.
+
+        Args:
+            text (str): The input text to be synthesized.
+            voice_preset (str, optional): The voice preset to be used for the synthesis. Defaults to "v2/en_speaker_1".
+
+        Returns:
+            tuple: A tuple containing the sample rate and the generated audio array.
+        """
+        sample_rate = None
+        buffer = None
+        for sample_rate, audio_array in self.stream_synthesize(text, voice_preset):
+            if buffer is None:
+                buffer = AudioBuffer(
+                    int(len(text) * SECONDS_PER_CHARACTER * sample_rate)
+                )
+            buffer.append(audio_array)
+
+        if buffer is None:
+            return sample_rate, AudioBuffer(0).finalize()
+        # The stream pauses between sentences; end with a pause too, like TextToSpeechService
+        buffer.append_silence(int(SENTENCE_PAUSE_SECONDS * sample_rate))
+        return sample_rate, buffer.finalize()
+
+    def close(self):
+        """
+        Shuts the worker processes down.
+
+        Returns:
+            None
+        """
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
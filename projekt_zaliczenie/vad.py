@@ -0,0 +1,187 @@
+import threading
+import numpy as np
+
+
+class VoiceActivityDetector:
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        frame_ms: int = 30,
+        speech_ratio: float = 3.0,
+        min_rms: float = 200.0,
+        start_ms: int = 90,
+        end_silence_ms: int = 800,
+        pre_roll_ms: int = 300,
+        post_roll_ms: int = 200,
+        max_speech_s: float = 30.0,
+    ):
+        """
+        Initializes the VoiceActivityDetector class, an energy-based detector of a single utterance in a stream
+        of int16 audio.
+
+        A frame counts as speech when its RMS energy exceeds both `min_rms` and `speech_ratio` times the noise
+        floor, which is tracked while nobody is speaking. The utterance starts after `start_ms` of speech and
+        ends after `end_silence_ms` of silence; leading and trailing silence is trimmed down to the pre- and
+        post-roll.
+
+        Args:
+            sample_rate (int, optional): The sample rate of the audio. Defaults to 16000.
+            frame_ms (int, optional): The length of an analysis frame in milliseconds. Defaults to 30.
+            speech_ratio (float, optional): How far above the noise floor speech must be. Defaults to 3.0.
+            min_rms (float, optional): The minimum RMS energy of speech, in int16 units. Defaults to 200.
+            start_ms (int, optional): The amount of speech that starts an utterance. Defaults to 90.
+            end_silence_ms (int, optional): The amount of silence that ends an utterance. Defaults to 800.
+            pre_roll_ms (int, optional): The audio kept before the start of speech. Defaults to 300.
+            post_roll_ms (int, optional): The silence kept after the end of speech. Defaults to 200.
+            max_speech_s (float, optional): The maximum length of an utterance in seconds. Defaults to 30.
+        """
+        self.sample_rate = sample_rate
+        self.frame_samples = sample_rate * frame_ms // 1000
+        self.speech_ratio = speech_ratio
+        self.min_rms = min_rms
+        self.start_frames = max(1, start_ms // frame_ms)
+        self.end_frames = max(1, end_silence_ms // frame_ms)
+        self.post_roll_frames = post_roll_ms // frame_ms
+        self.max_frames = int(max_speech_s * 1000) // frame_ms
+
+        self.pre_roll_frames = pre_roll_ms // frame_ms
+        self.noise_floor: float | None = None
+        self.triggered = False
+        self.finished = False
+        self._pending = np.zeros(0, dtype=np.int16)
+        self._frame_index = 0
+        self._start_frame = 0
+        self._last_speech_frame = 0
+        self._speech_run = 0
+        # accept() runs in the audio callback while speech_range() may be read from a decoding thread
+        self._lock = threading.Lock()
+
+    def is_speech(self, frame: np.ndarray) -> bool:
+        """
+        Classifies a single frame and updates the noise floor on silence.
+
+        Args:
+            frame (numpy.ndarray): An int16 frame of `frame_samples` samples.
+
+        Returns:
+            bool: Whether the frame contains speech.
+        """
+        rms = float(np.sqrt(np.mean(np.square(frame, dtype=np.float32))))
+        if self.noise_floor is None:
+            self.noise_floor = rms
+        speech = rms > max(self.min_rms, self.noise_floor * self.speech_ratio)
+        if not speech and not self.triggered:
+            self.noise_floor = 0.95 * self.noise_floor + 0.05 * rms
+        return speech
+
+    def accept(self, samples: np.ndarray) -> bool:
+        """
+        Feeds audio into the detector, e.g. from a sounddevice callback. The detector does not keep the audio;
+        it only tracks positions, counted in samples from the first call.
+
+        Args:
+            samples (numpy.ndarray): Mono int16 audio of any length.
+
+        Returns:
+            bool: Whether the utterance has finished.
+        """
+        if self.finished:
+            return True
+
+        samples = np.ravel(samples)
+        if len(self._pending):
+            samples = np.concatenate((self._pending, samples))
+        usable = len(samples) - len(samples) % self.frame_samples
+        # Copy the remainder, the caller may reuse the memory of `samples`
+        self._pending = samples[usable:].copy()
+
+        with self._lock:
+            for start in range(0, usable, self.frame_samples):
+                speech = self.is_speech(samples[start : start + self.frame_samples])
+                index = self._frame_index
+                self._frame_index += 1
+
+                if not self.triggered:
+                    self._speech_run = self._speech_run + 1 if speech else 0
+                    if self._speech_run >= self.start_frames:
+                        # Set the positions before the flag, a triggered detector always has them
+                        self._start_frame = max(0, index + 1 - self.pre_roll_frames)
+                        self._last_speech_frame = index
+                        self.triggered = True
+                    continue
+
+                if speech:
+                    self._last_speech_frame = index
+                if (
+                    index - self._last_speech_frame >= self.end_frames
+                    or index + 1 - self._start_frame >= self.max_frames
+                ):
+                    self.finished = True
+                    break
+
+        return self.finished
+
+    def speech_range(self):
+        """
+        Returns the position of the detected utterance, without leading and trailing silence beyond the pre- and
+        post-roll.
+
+        Returns:
+            tuple: The start and end positions in samples, or None if no speech was detected.
+        """
+        with self._lock:
+            if not self.triggered:
+                return None
+            start_frame = self._start_frame
+            end_frame = min(
+                self._frame_index, self._last_speech_frame + 1 + self.post_roll_frames
+            )
+        return start_frame * self.frame_samples, end_frame * self.frame_samples
+
+
+def trim_silence(
+    audio: np.ndarray,
+    sample_rate: int = 16000,
+    frame_ms: int = 20,
+    threshold_db: float = -35.0,
+    pad_ms: int = 150,
+) -> np.ndarray:
+    """
+    Cuts leading and trailing silence from a recording, keeping a short margin around the speech.
+
+    A frame counts as voiced when its RMS energy is within `threshold_db` of the loudest frame, so the
+    threshold follows the recording level.
+
+    Args:
+        audio (numpy.ndarray): Mono audio, int16 or float.
+        sample_rate (int, optional): The sample rate of the audio. Defaults to 16000.
+        frame_ms (int, optional): The length of an analysis frame in milliseconds. Defaults to 20.
+        threshold_db (float, optional): The level below the loudest frame that counts as silence. Defaults to -35.
+        pad_ms (int, optional): The margin kept before the first and after the last voiced frame. Defaults to 150.
+
+    Returns:
+        numpy.ndarray: A view of the voiced part of `audio`, empty if the recording is digital silence.
+    """
+    frame_samples = sample_rate * frame_ms // 1000
+    frames = len(audio) // frame_samples
+    if frames == 0:
+        return audio
+
+    rms = np.sqrt(
+        np.mean(
+            np.square(
+                audio[: frames * frame_samples].reshape(frames, frame_samples),
+                dtype=np.float32,
+            ),
+            axis=1,
+        )
+    )
+    peak = rms.max()
+    if peak == 0:
+        return audio[:0]
+
+    voiced = np.flatnonzero(rms >= peak * 10 ** (threshold_db / 20))
+    pad = sample_rate * pad_ms // 1000
+    start = max(0, voiced[0] * frame_samples - pad)
+    end = min(len(audio), (voiced[-1] + 1) * frame_samples + pad)
+    return audio[start:end]
@@ -0,0 +1,28 @@
+import os
+
+
+def available_memory() -> int:
+    """
+    Returns the amount of physical memory currently available, in bytes.
+    """
+    try:
+        with open("/proc/meminfo") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+
+
+def default_worker_count(worker_memory: int) -> int:
+    """
+    Sizes a process pool so that every worker fits into the available memory, with at most one worker per core.
+
+    Args:
+        worker_memory (int): The memory needed by a single worker in bytes.
+
+    Returns:
+        int: The number of workers, at least 1.
+    """
+    return max(1, min(os.cpu_count() or 1, available_memory() // worker_memory))